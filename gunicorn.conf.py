@@ -0,0 +1,86 @@
+"""
+Gunicorn configuration (loaded from the working directory, see Procfile).
+
+Environment variables:
+
+- WEB_CONCURRENCY: worker processes (set by Heroku from the dyno size)
+- GUNICORN_THREADS: threads per worker, more than 1 selects gthread workers
+- GUNICORN_WORKER_CLASS: override the worker class (e.g. uvicorn.workers.UvicornWorker
+  together with the learning_log.asgi:application app argument)
+- GUNICORN_PRELOAD: 'FALSE' imports the app in every worker instead of once
+  in the master process
+
+Workers log how long their warm-up took, their first request's latency and
+their resident memory to the error log.
+"""
+
+import multiprocessing
+import os
+import time
+
+wsgi_app = 'learning_log.wsgi:application'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+
+# Import Django once in the master, workers share its memory copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'TRUE') == 'TRUE'
+
+accesslog = '-'
+errorlog = '-'
+
+
+def _mib(size):
+    return f"{size / 2**20:.1f}MiB"
+
+
+def _memory():
+    """ Resident memory, and with /proc the proportional share (lower when preloaded pages are shared). """
+    from learning_log import warmup
+
+    pss = warmup.pss_bytes()
+    return f"RSS {_mib(warmup.rss_bytes())}" + (f", PSS {_mib(pss)}" if pss is not None else "")
+
+
+def when_ready(server):
+    """ Master: with preload, compile URLs and templates once before forking. """
+    if preload_app:
+        from learning_log import warmup
+        warmup.warm_up(databases=False)
+        server.log.info("Master ready, %s", _memory())
+
+
+def post_fork(server, worker):
+    """ Worker: drop database connections inherited from the master. """
+    if preload_app:
+        from django.db import connections
+
+        # A connection opened before fork() would be shared by all workers
+        for connection in connections.all():
+            connection.close()
+
+
+def post_worker_init(worker):
+    """ Worker (application loaded): connect, run warm-up requests. """
+    from learning_log import warmup
+
+    # Warm-up requests need a WSGI application (not an ASGI one)
+    application = worker.wsgi if worker_class in ('sync', 'gthread') else None
+    # Threads of gthread workers have their own connections (a pool keeps these)
+    elapsed = warmup.warm_up(application=application, close_connections=threads > 1)
+    worker.first_request_pending = True
+    worker.log.info("Worker %s warmed up in %.1fms, %s", worker.pid, elapsed * 1000, _memory())
+
+
+def pre_request(worker, req):
+    if getattr(worker, 'first_request_pending', False):
+        worker.first_request_started = time.perf_counter()
+
+
+def post_request(worker, req, environ, resp):
+    if getattr(worker, 'first_request_pending', False):
+        worker.first_request_pending = False
+        elapsed = time.perf_counter() - worker.first_request_started
+        worker.log.info("Worker %s first request %s took %.1fms, %s", worker.pid, req.path, elapsed * 1000, _memory())
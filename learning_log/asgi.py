@@ -5,6 +5,15 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+
+Serve with uvicorn workers under gunicorn:
+
+    gunicorn learning_log.asgi:application -k uvicorn.workers.UvicornWorker
+
+ASGI mode switches the read views (index, topics, topic) to their async
+versions from learning_logs.async_views (ASYNC_VIEWS environment variable).
+Every middleware of MIDDLEWARE must be async capable (learning_log/middleware.py),
+a single sync only one puts every request back in one shared thread.
 """
 
 import os
@@ -12,5 +21,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'learning_log.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'TRUE')
 
 application = get_asgi_application()
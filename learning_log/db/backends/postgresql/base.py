@@ -0,0 +1,137 @@
+"""
+PostgreSQL backend with connection health checks and an optional pool.
+
+Extra keys of a DATABASES entry:
+
+- CONN_HEALTH_CHECKS: before the first query of a request, check that a
+  reused connection (persistent or pooled) still works and reconnect if not
+  (a backport of the Django 4.1 setting)
+- POOL_SIZE: keep up to this many idle connections per process and hand
+  them to the threads that need one, instead of every thread keeping its
+  own. Use it with CONN_MAX_AGE = 0, so connections go back to the pool at
+  the end of each request.
+"""
+
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+# Idle connection pools by alias
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """ Idle psycopg2 connections of one database in this process. """
+
+    def __init__(self, size):
+        self.size = size
+        self.pid = os.getpid()
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """ Return an idle connection or None. """
+        with self._lock:
+            while self._idle:
+                connection = self._idle.pop()
+                if not connection.closed:
+                    return connection
+        return None
+
+    def put(self, connection):
+        """ Take back a connection, close it if it's broken or the pool is full. """
+        if connection.closed:
+            return
+        status = connection.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            connection.close()
+            return
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+def get_pool(alias, size):
+    """ Pool of the database alias in this process (connections aren't shared across fork()). """
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = ConnectionPool(size)
+        return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+        self.health_check_done = False
+        self.pool_size = self.settings_dict.get('POOL_SIZE') or 0
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.pool_size) if self.pool_size else None
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        while pool:
+            connection = pool.get()
+            if connection is None:
+                break
+            if not self.health_check_enabled or self._works(connection):
+                return connection
+            connection.close()
+        return super().get_new_connection(conn_params)
+
+    @staticmethod
+    def _works(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
+
+    def connect(self):
+        super().connect()
+        # New and pooled connections were just checked
+        self.health_check_done = True
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.put(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        # Called when a request starts and finishes
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        """ Close a reused connection that doesn't work anymore (once per request). """
+        if self.connection is None or not self.health_check_enabled or self.health_check_done:
+            return
+        if not self.in_atomic_block and not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,203 @@
+"""
+Per-view request metrics (wall time, database query count and time).
+
+MetricsMiddleware records every request into per-process histograms
+labelled by URL name (e.g. learning_logs:topic) and metrics_view exposes
+them in the Prometheus text format. Each thread records into its own
+shard, so recording takes no lock; shards are summed when scraped.
+
+Queries are counted by an execute wrapper installed on every database
+connection when it's created, which records into the QueryRecorder of
+the current request (a context variable). The context is copied into the
+threads sync_to_async() runs code in, so under ASGI the queries of sync
+views and of the database work of async views are counted too. Queries
+of streaming responses (sent after the middleware returns) are not.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Most SQL statements kept for the slow request log
+SLOW_LOG_MAX_QUERIES = 50
+
+
+class Histogram:
+    """ Prometheus style histogram with one label (view name). """
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []
+        # Only taken the first time a thread records
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def observe(self, view, value):
+        shard = self._shard()
+        series = shard.get(view)
+        if series is None:
+            # Bucket counts (+Inf last), then sum and count
+            series = shard[view] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def collect(self):
+        """ Return {view: merged series} over all threads. """
+        merged = {}
+        for shard in list(self._shards):
+            for view, series in list(shard.items()):
+                total = merged.setdefault(view, [0] * len(series))
+                for index, value in enumerate(series):
+                    total[index] += value
+        return merged
+
+    def exposition(self):
+        """ Prometheus text format lines. """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for view, series in sorted(self.collect().items()):
+            label = view.replace('\\', '\\\\').replace('"', '\\"')
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{view="{label}"}} {series[-2]}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {series[-1]}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'learning_log_request_duration_seconds', 'Request wall time.', DURATION_BUCKETS)
+REQUEST_QUERIES = Histogram(
+    'learning_log_request_db_queries', 'Database queries per request.', QUERY_COUNT_BUCKETS)
+REQUEST_DB_DURATION = Histogram(
+    'learning_log_request_db_duration_seconds', 'Database time per request.', DURATION_BUCKETS)
+HISTOGRAMS = (REQUEST_DURATION, REQUEST_QUERIES, REQUEST_DB_DURATION)
+
+
+class QueryRecorder:
+    """ Database execute wrapper counting queries and their time. """
+
+    def __init__(self, keep_sql):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_sql = keep_sql
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            if self.keep_sql and len(self.statements) < SLOW_LOG_MAX_QUERIES:
+                self.statements.append(f'({duration * 1000:.1f}ms) {sql}')
+
+
+# QueryRecorder of the request being handled
+_recorder = ContextVar('query_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """ Execute wrapper of every connection, records into the current request's recorder. """
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_recorder(connection, **kwargs):
+    # Connections are created again (same wrapper object) after being closed
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_recorder, dispatch_uid='learning_log.metrics.install_recorder')
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """ Record request metrics per resolved URL name. """
+
+    def handle(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        with self._recording(request):
+            return self.get_response(request)
+
+    async def ahandle(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        with self._recording(request):
+            return await self.get_response(request)
+
+    @contextmanager
+    def _recording(self, request):
+        slow_ms = settings.METRICS_SLOW_REQUEST_MS
+        recorder = QueryRecorder(keep_sql=slow_ms is not None)
+        # Connections of this thread opened before this module was imported
+        for connection in connections.all():
+            install_recorder(connection)
+        token = _recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _recorder.reset(token)
+        duration = time.perf_counter() - started
+
+        # URL name, not path, keeps the number of series bounded
+        match = request.resolver_match
+        view = match.view_name if match is not None else '<unresolved>'
+        REQUEST_DURATION.observe(view, duration)
+        REQUEST_QUERIES.observe(view, recorder.count)
+        REQUEST_DB_DURATION.observe(view, recorder.duration)
+
+        if slow_ms is not None and duration * 1000 >= slow_ms:
+            logger.warning(
+                "Slow request %s %s (%s): %.1fms, %d queries (%.1fms)\n%s",
+                request.method, request.path, view, duration * 1000,
+                recorder.count, recorder.duration * 1000, '\n'.join(recorder.statements),
+            )
+
+
+def metrics_view(request):
+    """ Metrics of this process in the Prometheus text format. """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        # Only development serves them to anyone
+        return HttpResponseForbidden()
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.exposition())
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,76 @@
+"""
+Middleware running in the mode of the server (WSGI or ASGI).
+
+Under ASGI, Django 3.2 adapts every sync-only middleware with
+sync_to_async(thread_sensitive=True): the rest of the chain, views
+included, then runs in the single thread shared by all requests, and
+requests queue behind each other however the views are written.
+Middleware derived from HybridMiddleware is called in the mode of the
+handler it wraps, so the project's middleware never forces the switch.
+Django's own middleware (MiddlewareMixin) is hybrid as well and only
+runs its short request and response hooks in the shared thread.
+HybridWhiteNoiseMiddleware replaces the sync only WhiteNoise middleware
+added by django_heroku (settings.py).
+"""
+
+import asyncio
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class HybridMiddleware:
+    """ Base of middleware working under WSGI and ASGI.
+
+    Subclasses implement handle() (sync) and ahandle() (async), both
+    wrapping self.get_response; requests go to the one matching the handler.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Marks instances as coroutine functions (like MiddlewareMixin),
+            # so Django awaits them
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.ahandle(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def ahandle(self, request):
+        raise NotImplementedError
+
+
+
+class HybridWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """ WhiteNoiseMiddleware (sync only in the pinned version) that is hybrid too. """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.ahandle(request)
+        return super().__call__(request)
+
+    async def ahandle(self, request):
+        # WhiteNoise's own call, in a pool thread as it opens static files;
+        # other paths get get_response(request) back unawaited
+        response = await sync_to_async(super().__call__, thread_sensitive=False)(request)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return response
@@ -0,0 +1,100 @@
+"""
+Primary/replica database routing.
+
+Replicas are the aliases in settings.DATABASE_REPLICAS (configured from
+DATABASE_REPLICA_URLS). ReplicaPinningMiddleware lets reads of GET and HEAD
+requests go to a random replica; everything else uses the primary
+('default'):
+
+- writes, and reads of other requests (POST handlers read what they write)
+- reads outside requests (management commands, signal receivers)
+- reads of a user who wrote in the last settings.REPLICA_PIN_SECONDS, so
+  they see their own changes despite replication lag (tracked with a
+  cookie, as writes may land in another process)
+
+REPLICA_PIN_SECONDS must be longer than the replication lag. Cached
+fragments are keyed by versions that pin recently changed topics to the
+primary as well (learning_logs/cache.py).
+"""
+
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .middleware import HybridMiddleware
+
+PRIMARY = 'default'
+
+# Set by ReplicaPinningMiddleware for the duration of a request
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+_wrote = contextvars.ContextVar('wrote', default=None)
+
+
+def reading_from_replica():
+    """ Whether reads of the current request may go to a replica. """
+    return bool(settings.DATABASE_REPLICAS) and _read_from_replica.get()
+
+
+def pin_to_primary():
+    """ Send the remaining reads of the current request to the primary. """
+    _read_from_replica.set(False)
+
+
+class PrimaryReplicaRouter:
+    """ Route reads to replicas when the current request allows it. """
+
+    def db_for_read(self, model, **hints):
+        if reading_from_replica():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote.append(model)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema by replication
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinningMiddleware(HybridMiddleware):
+    """ Allow replica reads for safe requests of users who didn't write recently. """
+
+    def handle(self, request):
+        with self._routing(request) as wrote:
+            response = self.get_response(request)
+        return self._pin(response, wrote)
+
+    async def ahandle(self, request):
+        # Views running in threads get copies of the context (same lists)
+        with self._routing(request) as wrote:
+            response = await self.get_response(request)
+        return self._pin(response, wrote)
+
+    @contextmanager
+    def _routing(self, request):
+        pinned = (request.method not in ('GET', 'HEAD')
+                  or settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        wrote = []
+        replica_token = _read_from_replica.set(not pinned)
+        wrote_token = _wrote.set(wrote)
+        try:
+            yield wrote
+        finally:
+            _read_from_replica.reset(replica_token)
+            _wrote.reset(wrote_token)
+
+    def _pin(self, response, wrote):
+        if wrote and settings.DATABASE_REPLICAS:
+            # Read own writes from the primary until replicas catch up
+            response.set_cookie(settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -35,6 +36,7 @@ INSTALLED_APPS = [
     # My Django apps
     'learning_logs',
     'users',
+    'tasks',
 
     # External Django apps
     'bootstrap4',
@@ -49,17 +51,30 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so it times the whole request
+    'learning_log.metrics.MetricsMiddleware',
+    # Only used with TEMPLATE_PROFILING
+    'learning_log.template_profiling.TemplateProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Anonymous pages from the cache, before anything reading the database
+    'learning_logs.page_cache.AnonymousPageCacheMiddleware',
+    # Before anything reading the database (sessions)
+    'learning_log.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # AuthenticationMiddleware with a cached request.user
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'learning_log.urls'
 
+# With DEBUG off and no 'loaders' option, Django wraps the default loaders in
+# its cached loader: templates are compiled once per process and kept in
+# memory (gunicorn workers compile all of them while warming up,
+# learning_log/warmup.py). Development reads them again on every render.
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -105,6 +120,51 @@ if os.environ.get('CI'):
         }
     }
 
+# Read replicas (learning_log/routers.py): comma separated database URLs, e.g.
+# DATABASE_REPLICA_URLS=sqlite:////path/to/replica.sqlite3 for a local copy
+import dj_database_url
+
+DATABASE_REPLICAS = []
+for number, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dj_database_url.parse(url.strip())
+    # Tests run against the primary only
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+# A replica for the routing tests (learning_log/test_routers.py), reading the
+# test database through a connection of its own
+if sys.argv[1:2] == ['test']:
+    DATABASES['test_replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['learning_log.routers.PrimaryReplicaRouter']
+# Reads of a user stay on the primary this long after they wrote (seconds)
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+REPLICA_PIN_COOKIE = 'read_primary'
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Version counters of cached pages and fragments (learning_logs/cache.py)
+# must be seen by every worker process: a write bumps them in the shared
+# cache. The local memory cache is private to each process, so it's only the
+# default in development, production defaults to the database cache (below).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Sessions are read from the cache and written through to the database
+# ('django.contrib.sessions.backends.signed_cookies' keeps them in the cookie)
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+# Cache of authenticated users (users/cache.py), 0 disables it
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 60))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -151,12 +211,134 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = '/users/login/'
 
+# Learning logs settings
+
+# Number of entries shown on one topic page
+ENTRIES_PER_PAGE = int(os.environ.get('ENTRIES_PER_PAGE', 25))
+# Number of topics shown on one topics list page
+TOPICS_PER_PAGE = int(os.environ.get('TOPICS_PER_PAGE', 50))
+# Cache holding rendered topic fragments and their version counters
+TOPIC_CACHE_ALIAS = 'default'
+# Lifetime of a rendered topic fragment (seconds)
+TOPIC_CACHE_TIMEOUT = int(os.environ.get('TOPIC_CACHE_TIMEOUT', 60 * 60))
+# Cache holding whole pages for anonymous visitors (learning_logs.page_cache)
+PAGE_CACHE_ALIAS = 'default'
+# Lifetime of a cached page (seconds), 0 disables the page cache. Defaults to
+# an hour with a cache shared by the worker processes, 0 otherwise (below).
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 60 * 60))
+# How long proxies and browsers may keep an anonymous page (they aren't purged)
+PAGE_CACHE_MAX_AGE = int(os.environ.get('PAGE_CACHE_MAX_AGE', 0))
+# Entries fetched at once while streaming a topic download
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 100))
+# Under ASGI downloads are written out before sending, to a temporary file above this many bytes
+EXPORT_SPOOL_MAX_SIZE = int(os.environ.get('EXPORT_SPOOL_MAX_SIZE', 1024 * 1024))
+# Changes ETags of every page on a new release (templates may have changed)
+ETAG_SALT = os.environ.get('HEROKU_RELEASE_VERSION', '')
+# Async read views (set by learning_log/asgi.py)
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == 'TRUE'
+# Run database work of async views in the single shared thread instead of a thread pool
+ASYNC_DB_THREAD_SENSITIVE = os.environ.get('ASYNC_DB_THREAD_SENSITIVE') == 'TRUE'
+# Most topics a JSON API batch request may ask for
+API_BATCH_MAX_TOPICS = int(os.environ.get('API_BATCH_MAX_TOPICS', 50))
+# PostgreSQL text search configuration of the entry search index
+SEARCH_CONFIG = os.environ.get('SEARCH_CONFIG', 'english')
+# Most results of a search on databases without a full-text index (scanned in Python)
+SEARCH_FALLBACK_MAX_RESULTS = int(os.environ.get('SEARCH_FALLBACK_MAX_RESULTS', 200))
+# Markup of entry text: 'text' or 'markdown' (run render_entries --all after a change)
+ENTRY_MARKUP = os.environ.get('ENTRY_MARKUP', 'text')
+
+# Entry texts of at least this many bytes are stored compressed with
+# ENTRY_COMPRESSION, 'zlib' or 'zstd' (needs the zstandard package)
+ENTRY_COMPRESSION = os.environ.get('ENTRY_COMPRESSION', 'zlib')
+ENTRY_COMPRESSION_THRESHOLD = int(os.environ.get('ENTRY_COMPRESSION_THRESHOLD', 1024))
+# Most entries added by one bulk request (views.new_entries), empty forms shown
+BULK_ENTRIES_MAX = int(os.environ.get('BULK_ENTRIES_MAX', 500))
+BULK_ENTRIES_EXTRA = 5
+# Entries removed per transaction when a deleted topic is purged (learning_logs/deletion.py)
+TOPIC_PURGE_BATCH_SIZE = int(os.environ.get('TOPIC_PURGE_BATCH_SIZE', 1000))
+
+# Pages requested by every gunicorn worker before it serves traffic (learning_log/warmup.py)
+WARMUP_PATHS = ['/', '/topics/']
+
+# Report template and block render times in a Server-Timing header
+# (learning_log/template_profiling.py, development only)
+TEMPLATE_PROFILING = os.environ.get('TEMPLATE_PROFILING', 'FALSE') == 'TRUE'
+
+# Request metrics (learning_log/metrics.py)
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'TRUE') == 'TRUE'
+# Log requests slower than this many milliseconds with their SQL (off if unset)
+METRICS_SLOW_REQUEST_MS = float(os.environ['METRICS_SLOW_REQUEST_MS']) if os.environ.get('METRICS_SLOW_REQUEST_MS') else None
+# Bearer token required by the /metrics/ endpoint (with DEBUG off an empty
+# token closes it, in development it's open)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 # Production settings
 import django_heroku
 
 django_heroku.settings(locals())
 
+# WhiteNoise added by django_heroku is sync only, under ASGI it would run
+# every request in Django's single shared thread (learning_log/middleware.py)
+MIDDLEWARE = [
+    'learning_log.middleware.HybridWhiteNoiseMiddleware' if name == 'whitenoise.middleware.WhiteNoiseMiddleware' else name
+    for name in MIDDLEWARE
+]
+
 if os.environ.get('DEBUG') == 'TRUE':
     DEBUG = True
 elif os.environ.get('DEBUG') == 'FALSE':
     DEBUG = False
+
+# Cache shared by the worker processes unless CACHE_BACKEND picks one, its
+# table is created by the release step of the Procfile (createcachetable)
+if not DEBUG and 'CACHE_BACKEND' not in os.environ:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION') or 'learning_log_cache',
+    }
+
+# A purge only reaches the pages cached by other processes through a shared
+# cache, the local memory cache would serve them stale for PAGE_CACHE_TIMEOUT
+if ('PAGE_CACHE_TIMEOUT' not in os.environ
+        and CACHES[PAGE_CACHE_ALIAS]['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache'):
+    PAGE_CACHE_TIMEOUT = 0
+
+# Static files are served by WhiteNoise (added by django_heroku). In production
+# collectstatic fingerprints them (CompressedManifestStaticFilesStorage) and
+# stores gzip and, with the Brotli package installed, brotli variants next to
+# them; hashed names are sent with a one year `immutable` Cache-Control.
+if DEBUG:
+    # Development and tests render pages without running collectstatic
+    STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+
+# Background tasks (tasks/registry.py) run where TASKS_BACKEND says:
+# 'immediate' after the commit in the request (default in development and
+# tests), 'thread' in a thread pool of the web process (default in
+# production) or 'database' by `manage.py run_worker` processes
+TASKS_BACKEND = os.environ.get('TASKS_BACKEND', 'immediate' if DEBUG else 'thread')
+TASKS_THREADS = int(os.environ.get('TASKS_THREADS', 2))
+# Runs of a failing task, the first retry after TASKS_RETRY_DELAY seconds, doubling
+TASKS_MAX_ATTEMPTS = int(os.environ.get('TASKS_MAX_ATTEMPTS', 5))
+TASKS_RETRY_DELAY = float(os.environ.get('TASKS_RETRY_DELAY', 2))
+# Seconds a run_worker process has to finish a task before others run it again
+TASKS_LEASE = int(os.environ.get('TASKS_LEASE', 60 * 60))
+
+# Database connections (after django_heroku, which sets DATABASES['default']
+# from DATABASE_URL). Connections are kept open between requests for
+# DATABASE_CONN_MAX_AGE seconds (0 closes them after every request).
+# PostgreSQL databases use learning_log/db/backends/postgresql, which checks
+# reused connections before the first query of a request and can pool idle
+# connections between the threads of a worker (DATABASE_POOL_SIZE > 0).
+DATABASE_CONN_MAX_AGE = int(os.environ.get('DATABASE_CONN_MAX_AGE', 600))
+DATABASE_CONN_HEALTH_CHECKS = os.environ.get('DATABASE_CONN_HEALTH_CHECKS', 'TRUE') == 'TRUE'
+DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 0))
+
+for database in DATABASES.values():
+    if database['ENGINE'] in ('django.db.backends.postgresql', 'django.db.backends.postgresql_psycopg2'):
+        database['ENGINE'] = 'learning_log.db.backends.postgresql'
+        database['CONN_HEALTH_CHECKS'] = DATABASE_CONN_HEALTH_CHECKS
+        database['POOL_SIZE'] = DATABASE_POOL_SIZE
+    # Pooled connections go back to the pool at the end of each request
+    database['CONN_MAX_AGE'] = 0 if DATABASE_POOL_SIZE else DATABASE_CONN_MAX_AGE
@@ -0,0 +1,114 @@
+"""
+Opt-in template render profiling (settings.TEMPLATE_PROFILING).
+
+While enabled, the render time of every template and every {% block %}
+(e.g. learning_logs/topic.html, header, content) is measured per request
+and reported in a Server-Timing response header, which browser developer
+tools show in the request's timing panel:
+
+    Server-Timing: template;desc="learning_logs/topic.html";dur=3.1, block;desc="content";dur=2.4, ...
+
+Times are inclusive (a template's time contains the base template it
+extends and its blocks) and summed over repeated renders. Profiling
+wraps Template._render and BlockNode.render, adding a little overhead to
+every render, so it's meant for finding slow blocks, not for production.
+"""
+
+import contextvars
+import functools
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.base import Template
+from django.template.loader_tags import BlockNode
+
+from .middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Timings of the current request: {(kind, name): [seconds, renders]}, None when not profiling
+_timings = contextvars.ContextVar('template_timings', default=None)
+
+_installed = False
+
+
+def _record(kind, name, duration):
+    timings = _timings.get()
+    if timings is not None:
+        timing = timings.setdefault((kind, name), [0.0, 0])
+        timing[0] += duration
+        timing[1] += 1
+
+
+def _profiled(kind, get_name, render):
+    @functools.wraps(render)
+    def wrapper(self, context):
+        if _timings.get() is None:
+            return render(self, context)
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            _record(kind, get_name(self), time.perf_counter() - started)
+    return wrapper
+
+
+def install():
+    """ Wrap template and block rendering (once per process). """
+    global _installed
+    if not _installed:
+        _installed = True
+        Template._render = _profiled('template', lambda template: template.name or '<string>', Template._render)
+        BlockNode.render = _profiled('block', lambda block: block.name, BlockNode.render)
+
+
+def server_timing(timings):
+    """ Server-Timing header value of timings, slowest first. """
+    entries = []
+    for (kind, name), (duration, renders) in sorted(timings.items(), key=lambda item: -item[1][0]):
+        desc = name.replace('\\', '\\\\').replace('"', '\\"')
+        if renders > 1:
+            desc += f' x{renders}'
+        entries.append(f'{kind};desc="{desc}";dur={duration * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class TemplateProfilingMiddleware(HybridMiddleware):
+    """ Report template and block render times of each response in Server-Timing. """
+
+    def __init__(self, get_response):
+        if not settings.TEMPLATE_PROFILING:
+            raise MiddlewareNotUsed
+        install()
+        super().__init__(get_response)
+
+    def handle(self, request):
+        token = _timings.set({})
+        try:
+            response = self.get_response(request)
+            timings = _timings.get()
+        finally:
+            _timings.reset(token)
+        return self._report(request, response, timings)
+
+    async def ahandle(self, request):
+        # Views rendering in threads get copies of the context (same dict)
+        token = _timings.set({})
+        try:
+            response = await self.get_response(request)
+            timings = _timings.get()
+        finally:
+            _timings.reset(token)
+        return self._report(request, response, timings)
+
+    def _report(self, request, response, timings):
+        if timings:
+            header = server_timing(timings)
+            # Keep timings added by other middleware
+            if response.has_header('Server-Timing'):
+                header = f"{response['Server-Timing']}, {header}"
+            response['Server-Timing'] = header
+            logger.debug("Template timings of %s: %s", request.path, header)
+        return response
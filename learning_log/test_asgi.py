@@ -0,0 +1,40 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.module_loading import import_string
+
+from .middleware import HybridWhiteNoiseMiddleware
+
+
+class AsgiMiddlewareTests(SimpleTestCase):
+    def test_middleware_is_async_capable(self):
+        # One sync only middleware makes Django run the rest of the chain,
+        # views included, in its single shared thread
+        sync_only = [name for name in settings.MIDDLEWARE
+                     if not getattr(import_string(name), 'async_capable', False)]
+        self.assertEqual(sync_only, [])
+
+    def test_chain_is_async(self):
+        # Sync middleware would have been adapted into a sync chain
+        self.assertTrue(asyncio.iscoroutinefunction(ASGIHandler()._middleware_chain))
+
+
+class HybridWhiteNoiseMiddlewareTests(SimpleTestCase):
+    @override_settings(WHITENOISE_USE_FINDERS=True, WHITENOISE_AUTOREFRESH=True)
+    def test_async(self):
+        async def view(request):
+            return HttpResponse("view")
+
+        middleware = HybridWhiteNoiseMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        factory = RequestFactory()
+
+        response = async_to_sync(middleware)(factory.get("/static/learning_logs/vendor/jquery-3.5.1/jquery.min.js"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("javascript", response["Content-Type"])
+        response.close()
+        self.assertEqual(async_to_sync(middleware)(factory.get("/topics/")).content, b"view")
@@ -0,0 +1,63 @@
+import copy
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TestCase
+
+ENGINE = "learning_log.db.backends.postgresql"
+
+
+class BenchConnectionsTests(TestCase):
+    def test_report(self):
+        output = StringIO()
+        call_command("bench_connections", requests=3, stdout=output)
+        self.assertIn("new connection", output.getvalue())
+        self.assertIn("persistent", output.getvalue())
+
+
+@unittest.skipUnless(connection.settings_dict["ENGINE"] == ENGINE, "PostgreSQL backend only")
+class PostgreSQLConnectionTests(SimpleTestCase):
+    databases = {"default"}
+
+    def _wrapper(self, alias, **overrides):
+        settings_dict = {**copy.deepcopy(connection.settings_dict), **overrides}
+        wrapper = load_backend(ENGINE).DatabaseWrapper(settings_dict, alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def _query(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            return cursor.fetchone()[0]
+
+    def test_pool_reuses_connections(self):
+        wrapper = self._wrapper("pool-test", CONN_MAX_AGE=0, POOL_SIZE=1, CONN_HEALTH_CHECKS=True)
+        self.addCleanup(lambda: wrapper.pool.close())
+        self._query(wrapper)
+        raw = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertIsNone(wrapper.connection)
+        self._query(wrapper)
+        self.assertIs(wrapper.connection, raw)
+
+    def test_pool_drops_broken_connections(self):
+        wrapper = self._wrapper("pool-broken-test", CONN_MAX_AGE=0, POOL_SIZE=1, CONN_HEALTH_CHECKS=True)
+        self.addCleanup(lambda: wrapper.pool.close())
+        self._query(wrapper)
+        raw = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        # Connection dies while idle in the pool
+        raw.close()
+        self.assertEqual(self._query(wrapper), 1)
+        self.assertIsNot(wrapper.connection, raw)
+
+    def test_health_check_reconnects(self):
+        wrapper = self._wrapper("health-check-test", CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=True)
+        self._query(wrapper)
+        # Next request finds the persistent connection broken
+        wrapper.connection.close()
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertEqual(self._query(wrapper), 1)
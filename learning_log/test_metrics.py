@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+from django.shortcuts import reverse
+from django.contrib.auth.models import User
+
+from learning_logs.models import Topic
+from .metrics import Histogram, MetricsMiddleware, REQUEST_DURATION, REQUEST_QUERIES
+
+
+class HistogramTests(TestCase):
+    def test_threads_are_merged(self):
+        histogram = Histogram("test_seconds", "Test.", (1, 10))
+
+        def record():
+            for value in (0.5, 5, 50):
+                histogram.observe("view", value)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(histogram.collect()["view"], [4, 4, 4, 4 * 55.5, 12])
+        lines = histogram.exposition()
+        self.assertIn('test_seconds_bucket{view="view",le="10"} 8', lines)
+        self.assertIn('test_seconds_bucket{view="view",le="+Inf"} 12', lines)
+        self.assertIn('test_seconds_count{view="view"} 12', lines)
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+
+    def test_queries_recorded_per_view(self):
+        before = REQUEST_QUERIES.collect().get("learning_logs:topic", [0] * 14)
+        self.client.get(reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id}))
+        after = REQUEST_QUERIES.collect()["learning_logs:topic"]
+        # One more request with at least one query
+        self.assertEqual(after[-1], before[-1] + 1)
+        self.assertGreaterEqual(after[-2], before[-2] + 1)
+
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'learning_log_request_db_queries_count{view="learning_logs:topic"}')
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_token_required_in_production(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_log(self):
+        with self.assertLogs("learning_log.metrics", "WARNING") as logs:
+            self.client.get(reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id}))
+        self.assertIn("learning_logs:topic", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+
+class AsyncMetricsMiddlewareTests(SimpleTestCase):
+    def test_async_handler(self):
+        async def get_response(request):
+            request.resolver_match = resolve(reverse("metrics"))
+            return HttpResponse()
+
+        middleware = MetricsMiddleware(get_response)
+        # Awaited by Django's ASGI handler instead of run in its shared thread
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        before = REQUEST_DURATION.collect().get("metrics", [0] * 14)
+        async_to_sync(middleware)(RequestFactory().get("/metrics/"))
+        self.assertEqual(REQUEST_DURATION.collect()["metrics"][-1], before[-1] + 1)
+
+
+class AsyncQueryMetricsTests(TransactionTestCase):
+    def test_queries_of_other_threads(self):
+        async def get_response(request):
+            request.resolver_match = resolve(reverse("learning_logs:topics"))
+            # Database work of async views runs in pool threads
+            for _ in range(2):
+                await sync_to_async(Topic.objects.count, thread_sensitive=False)()
+            return HttpResponse()
+
+        before = REQUEST_QUERIES.collect().get("learning_logs:topics", [0] * 14)
+        async_to_sync(MetricsMiddleware(get_response))(RequestFactory().get("/topics/"))
+        after = REQUEST_QUERIES.collect()["learning_logs:topics"]
+        self.assertEqual(after[-1], before[-1] + 1)
+        self.assertEqual(after[-2], before[-2] + 2)
@@ -0,0 +1,185 @@
+""" Query and time budgets of every URL name of learning_logs and users.
+
+Each URL name has a Budget: most database queries and milliseconds one
+request may take. Requests are made at several data sizes (topics per
+user and entries per topic) with the cache cleared before each request,
+so the counts are the worst case. A view loading related objects one by
+one (N+1) goes over its budget at the bigger sizes and the failure lists
+the SQL it ran. Work done by background tasks after the commit is not
+counted.
+
+New URL names need a budget here (test_every_url_name_has_a_budget).
+Time budgets are generous wall times of a development machine, scale
+them with QUERY_BUDGET_TIME_FACTOR on slow CI runners.
+"""
+
+import json
+import os
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import TestCase, Client
+from django.urls import URLResolver, get_resolver, reverse
+
+from learning_logs import bulk
+from learning_logs.models import Topic
+from .metrics import QueryRecorder
+
+# Topics per user and entries per topic
+SIZES = (1, 10, 30)
+
+TIME_FACTOR = float(os.environ.get('QUERY_BUDGET_TIME_FACTOR', 1))
+
+Budget = namedtuple('Budget', 'queries ms')
+
+# Logged in requests read the session and the user on top of the view's queries
+BUDGETS = {
+    'learning_logs:index': Budget(2, 200),
+    'learning_logs:topics': Budget(4, 300),
+    'learning_logs:topic': Budget(5, 300),
+    'learning_logs:export_topic': Budget(2, 300),
+    'learning_logs:new_topic': Budget(3, 300),
+    'learning_logs:delete_topic': Budget(4, 300),
+    'learning_logs:new_entry': Budget(4, 300),
+    'learning_logs:new_entries': Budget(7, 500),
+    'learning_logs:edit_entry': Budget(4, 300),
+    'learning_logs:search': Budget(3, 300),
+    'learning_logs:api_topics': Budget(4, 300),
+    'learning_logs:api_topic_entries': Budget(2, 300),
+    'learning_logs:api_entries_batch': Budget(3, 300),
+    'users:login': Budget(9, 1000),
+    'users:logout': Budget(4, 300),
+    'users:password_change': Budget(2, 300),
+    'users:password_change_done': Budget(2, 300),
+    'users:password_reset': Budget(0, 300),
+    'users:password_reset_done': Budget(0, 300),
+    'users:password_reset_confirm': Budget(1, 300),
+    'users:password_reset_complete': Budget(0, 300),
+    'users:register': Budget(0, 300),
+}
+
+
+def url_names(resolver, namespace=''):
+    """ Names of all URL patterns of resolver, prefixed with their namespace. """
+    names = set()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = f'{namespace}{pattern.namespace}:' if pattern.namespace else namespace
+            names |= url_names(pattern, prefix)
+        elif pattern.name:
+            names.add(f'{namespace}{pattern.name}')
+    return names
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test", email="test@email.com", password="test")
+        self.other = User.objects.create_user(username="test2", email="test2@email.com", password="test2")
+
+    def test_every_url_name_has_a_budget(self):
+        names = url_names(get_resolver('learning_logs.urls'), 'learning_logs:')
+        names |= url_names(get_resolver('users.urls'), 'users:')
+        self.assertEqual(names, set(BUDGETS))
+
+    def test_budgets(self):
+        for size in SIZES:
+            with self.subTest(size=size), transaction.atomic():
+                self._create_data(size)
+                for name, method, kwargs, data, login in self._requests():
+                    self._check(size, name, method, reverse(name, kwargs=kwargs), data, login)
+                transaction.set_rollback(True)
+
+    def _create_data(self, size):
+        """ size topics (every other one public) of both users, size entries each. """
+        # Run the tasks (rendering, search index, counters) of the new entries
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in (self.user, self.other):
+                for number in range(size):
+                    topic = Topic.objects.create(user=user, text=f"Topic {number}", public=number % 2 == 0)
+                    bulk.create_entries(topic, [f"python entry {index}\nof {topic.text}" for index in range(size)])
+        self.topic = Topic.objects.filter(user=self.user).first()
+        self.entry = self.topic.entry_set.first()
+        self.public_topic = Topic.objects.filter(user=self.other, public=True).first()
+
+    def _requests(self):
+        """ (URL name, method, URL kwargs, data, log in) of the requests made. """
+        topic = {'topic_id': self.topic.id}
+        batch = Topic.objects.values_list('id', flat=True)[:settings.API_BATCH_MAX_TOPICS]
+        batch = ','.join(str(topic_id) for topic_id in batch)
+        texts = [{'text': f"new entry {index}"} for index in range(self.topic.entry_set.count())]
+        return [
+            ('learning_logs:index', 'get', {}, None, False),
+            ('learning_logs:index', 'get', {}, None, True),
+            ('learning_logs:topics', 'get', {}, None, False),
+            ('learning_logs:topics', 'get', {}, None, True),
+            ('learning_logs:topic', 'get', topic, None, True),
+            ('learning_logs:topic', 'get', {'topic_id': self.public_topic.id}, None, False),
+            ('learning_logs:export_topic', 'get', {**topic, 'fmt': 'md'}, None, True),
+            ('learning_logs:export_topic', 'get', {**topic, 'fmt': 'csv'}, None, True),
+            ('learning_logs:new_topic', 'get', {}, None, True),
+            ('learning_logs:new_topic', 'post', {}, {'text': "New topic"}, True),
+            ('learning_logs:delete_topic', 'get', topic, None, True),
+            ('learning_logs:delete_topic', 'post', topic, {}, True),
+            ('learning_logs:new_entry', 'get', topic, None, True),
+            ('learning_logs:new_entry', 'post', topic, {'text': "New entry"}, True),
+            ('learning_logs:new_entries', 'get', topic, None, True),
+            ('learning_logs:new_entries', 'post', topic, {'entries': texts}, True),
+            ('learning_logs:edit_entry', 'get', {'entry_id': self.entry.id}, None, True),
+            ('learning_logs:edit_entry', 'post', {'entry_id': self.entry.id}, {'text': "Edited"}, True),
+            ('learning_logs:search', 'get', {}, {'q': "python"}, False),
+            ('learning_logs:search', 'get', {}, {'q': "python"}, True),
+            ('learning_logs:api_topics', 'get', {}, None, True),
+            ('learning_logs:api_topic_entries', 'get', topic, None, True),
+            ('learning_logs:api_entries_batch', 'get', {}, {'topics': batch}, True),
+            ('users:login', 'get', {}, None, False),
+            ('users:login', 'post', {}, {'username': "test", 'password': "test"}, False),
+            ('users:logout', 'get', {}, None, True),
+            ('users:password_change', 'get', {}, None, True),
+            ('users:password_change_done', 'get', {}, None, True),
+            ('users:password_reset', 'get', {}, None, False),
+            ('users:password_reset_done', 'get', {}, None, False),
+            ('users:password_reset_confirm', 'get', {'uidb64': 'MQ', 'token': 'set-password'}, None, False),
+            ('users:password_reset_complete', 'get', {}, None, False),
+            ('users:register', 'get', {}, None, False),
+        ]
+
+    def _check(self, size, name, method, url, data, login):
+        budget = BUDGETS[name]
+        with transaction.atomic():
+            # Sessions are rolled back with everything else
+            client = Client()
+            if login:
+                client.force_login(self.user)
+            cache.clear()
+
+            recorder = QueryRecorder(keep_sql=True)
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                started = time.perf_counter()
+                if method == 'get':
+                    response = client.get(url, data)
+                elif isinstance(data, dict) and 'entries' in data:
+                    response = client.post(url, json.dumps(data), content_type='application/json')
+                else:
+                    response = client.post(url, data)
+                if response.streaming:
+                    # Streamed responses query while being sent
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+
+        request = f"{method.upper()} {url} ({name}, size {size}, {'logged in' if login else 'anonymous'})"
+        self.assertLess(response.status_code, 400, request)
+        if recorder.count > budget.queries:
+            self.fail(f"{request} made {recorder.count} queries, budget {budget.queries}:\n"
+                      + '\n'.join(recorder.statements))
+        if elapsed > budget.ms * TIME_FACTOR:
+            self.fail(f"{request} took {elapsed:.1f}ms, budget {budget.ms * TIME_FACTOR:.0f}ms "
+                      f"({recorder.count} queries, {recorder.duration * 1000:.1f}ms):\n"
+                      + '\n'.join(recorder.statements))
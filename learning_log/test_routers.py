@@ -0,0 +1,113 @@
+import asyncio
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+
+from learning_logs.cache import bump_topic_version, topic_version
+from learning_logs.models import Topic
+from .routers import PrimaryReplicaRouter, ReplicaPinningMiddleware
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+        self.user = User.objects.create_user(username="test", password="test")
+
+    def _request(self, request, write=False, read_version_of=None):
+        """ Run request through the middleware, return (read alias, response). """
+        aliases = []
+
+        def view(request):
+            if write:
+                Topic.objects.create(user=self.user, text="Topic", public=False)
+            if read_version_of is not None:
+                topic_version(read_version_of)
+            aliases.append(self.router.db_for_read(Topic))
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return aliases[0], response
+
+    def test_get_reads_replica(self):
+        alias, response = self._request(self.factory.get("/"))
+        self.assertEqual(alias, "replica1")
+        self.assertNotIn("read_primary", response.cookies)
+
+    def test_post_reads_primary_and_pins(self):
+        alias, response = self._request(self.factory.post("/"), write=True)
+        self.assertEqual(alias, "default")
+        self.assertEqual(response.cookies["read_primary"]["max-age"], 10)
+
+        request = self.factory.get("/")
+        request.COOKIES["read_primary"] = "1"
+        self.assertEqual(self._request(request)[0], "default")
+
+    def test_recently_changed_version_reads_primary(self):
+        bump_topic_version(1)
+        self.assertEqual(self._request(self.factory.get("/"), read_version_of=1)[0], "default")
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.assertEqual(self._request(self.factory.get("/"), read_version_of=1)[0], "replica1")
+
+    def test_async_views(self):
+        aliases = []
+
+        def work():
+            # In a pool thread, like the database work of async views
+            self.router.db_for_write(Topic)
+            aliases.append(self.router.db_for_read(Topic))
+
+        async def view(request):
+            await sync_to_async(work, thread_sensitive=False)()
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(self.factory.get("/"))
+        self.assertEqual(aliases, ["replica1"])
+        self.assertIn("read_primary", response.cookies)
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Topic), "default")
+        self.assertEqual(self.router.db_for_write(Topic), "default")
+        self.assertFalse(self.router.allow_migrate("replica1", "learning_logs"))
+        self.assertTrue(self.router.allow_migrate("default", "learning_logs"))
+
+
+@override_settings(DATABASE_REPLICAS=["test_replica"], REPLICA_PIN_SECONDS=10)
+class ReplicaDatabaseTests(TransactionTestCase):
+    databases = {"default", "test_replica"}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.topic = Topic.objects.create(user=self.user, text="Topic", public=True)
+
+    def _request(self, request, write=False):
+        """ Run request through the middleware, return (primary, replica) queries and response. """
+        def view(request):
+            if write:
+                Topic.objects.create(user=self.user, text="New topic", public=False)
+            self.assertEqual(Topic.objects.get(id=self.topic.id).text, "Topic")
+            return HttpResponse()
+
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["test_replica"]) as replica:
+                response = ReplicaPinningMiddleware(view)(request)
+        return len(primary), len(replica), response
+
+    def test_get_reads_replica(self):
+        self.assertEqual(self._request(self.factory.get("/"))[:2], (0, 1))
+
+    def test_reads_stay_on_primary_after_write(self):
+        primary, replica, response = self._request(self.factory.post("/"), write=True)
+        self.assertEqual((primary, replica), (2, 0))
+
+        request = self.factory.get("/")
+        request.COOKIES["read_primary"] = response.cookies["read_primary"].value
+        self.assertEqual(self._request(request)[:2], (1, 0))
@@ -0,0 +1,33 @@
+import re
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase, Client, override_settings
+
+
+class StaticAssetsTests(TestCase):
+    def test_pages_load_no_external_assets(self):
+        response = self.client.get(reverse("learning_logs:index"))
+        assets = re.findall(r'<(?:link|script)[^>]+(?:href|src)="([^"]+)"', response.content.decode())
+        self.assertEqual(len(assets), 4)
+        for url in assets:
+            self.assertTrue(url.startswith("/static/learning_logs/vendor/"), url)
+
+    def test_collected_assets_are_fingerprinted_and_compressed(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        storage = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+        with override_settings(STATIC_ROOT=root, STATICFILES_STORAGE=storage):
+            call_command("collectstatic", interactive=False, verbosity=0, stdout=StringIO())
+            client = Client()
+            response = client.get(reverse("learning_logs:index"))
+            url = re.search(r'href="(/static/[^"]+bootstrap\.min\.[0-9a-f]{12}\.css)"', response.content.decode())
+            self.assertIsNotNone(url)
+
+            response = client.get(url.group(1), HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertIn("immutable", response["Cache-Control"])
@@ -0,0 +1,57 @@
+import asyncio
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.http import HttpResponse
+from django.template import engines
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.shortcuts import reverse
+from django.contrib.auth.models import User
+
+from learning_logs.models import Topic
+from .template_profiling import TemplateProfilingMiddleware, server_timing
+
+
+class ServerTimingTests(TestCase):
+    def test_header_value(self):
+        header = server_timing({
+            ("block", "content"): [0.001, 1],
+            ("template", 'a"b.html'): [0.002, 2],
+        })
+        self.assertEqual(
+            header,
+            'template;desc="a\\"b.html x2";dur=2.00, block;desc="content";dur=1.00',
+        )
+
+
+class TemplateProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+        self.url = reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id})
+
+    def test_disabled(self):
+        response = Client().get(self.url)
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_templates_and_blocks(self):
+        # A new client loads the middleware with the overridden settings
+        response = Client().get(self.url)
+        header = response["Server-Timing"]
+        for desc in ("learning_logs/topic.html", "learning_logs/base.html", "header", "content"):
+            self.assertIn(f'desc="{desc}";dur=', header)
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_async_handler(self):
+        template = engines["django"].from_string("{% block greeting %}Hello{% endblock %}")
+
+        async def get_response(request):
+            # Rendered in a pool thread, like the sync parts of async views
+            return HttpResponse(await sync_to_async(template.render, thread_sensitive=False)())
+
+        middleware = TemplateProfilingMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().get("/"))
+        self.assertIn('block;desc="greeting";dur=', response["Server-Timing"])
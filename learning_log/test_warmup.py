@@ -0,0 +1,31 @@
+from django.core.signals import request_finished, request_started
+from django.core.wsgi import get_wsgi_application
+from django.db import close_old_connections
+from django.test import TestCase
+
+from . import warmup
+
+
+class WarmUpTests(TestCase):
+    # Warming up connects to every database
+    databases = "__all__"
+
+    def test_templates(self):
+        names = {name for _, name in warmup.project_templates()}
+        self.assertIn("learning_logs/base.html", names)
+        self.assertIn("registration/login.html", names)
+        # Admin templates of installed packages are left alone
+        self.assertNotIn("admin/base.html", names)
+        self.assertEqual(warmup.warm_up_templates(), len(names))
+
+    def test_requests(self):
+        # Like the test client: don't close the test transaction's connection
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        with self.settings(WARMUP_PATHS=["/", "/topics/"]):
+            self.assertEqual(warmup.warm_up_requests(get_wsgi_application()), ["200", "200"])
+
+    def test_warm_up(self):
+        self.assertGreater(warmup.warm_up(), 0)
+        self.assertGreater(warmup.rss_bytes(), 0)
@@ -16,8 +16,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from . import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics.metrics_view, name='metrics'),
     path('users/', include('users.urls')),
     path('', include('learning_logs.urls'))
 ]
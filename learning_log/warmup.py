@@ -0,0 +1,142 @@
+"""
+Warm-up of a freshly started process, so its first request isn't slower
+than the rest (used by gunicorn.conf.py).
+
+- URL resolver: patterns of every included URLconf are imported and
+  compiled on first use
+- templates: with the cached template loader every template is read and
+  compiled once per process
+- static files: the manifest of fingerprinted names is read on first use
+- database: opening a connection costs a network round trip and the TLS
+  handshake
+- requests: the first request through a view still imports and compiles
+  things lazily (translations, regular expressions), so a few anonymous
+  GETs of settings.WARMUP_PATHS go through the application
+"""
+
+import logging
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.test import RequestFactory
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up_urls():
+    """ Populate the URL resolver (and import every view module). """
+    resolver = get_resolver()
+    # Builds reverse lookups of all included URLconfs
+    resolver.reverse_dict
+    for namespace in resolver.namespace_dict:
+        resolver.namespace_dict[namespace][1].reverse_dict
+
+
+def project_templates():
+    """ Names of templates in the project's template directories (not installed packages). """
+    base_dir = Path(settings.BASE_DIR).resolve()
+    for engine in engines.all():
+        # Directories of the loaders (the cached loader reports those it wraps)
+        directories = {Path(directory).resolve() for loader in engine.engine.template_loaders
+                       if hasattr(loader, 'get_dirs') for directory in loader.get_dirs()}
+        for directory in sorted(directories):
+            if base_dir not in directory.parents:
+                continue
+            for path in directory.rglob('*'):
+                if path.is_file() and path.suffix in ('.html', '.txt'):
+                    yield engine, path.relative_to(directory).as_posix()
+
+
+def warm_up_templates():
+    """ Load (and with the cached loader, keep compiled) every project template. """
+    count = 0
+    for engine, name in project_templates():
+        try:
+            engine.get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError):
+            logger.exception("Template %s can't be warmed up", name)
+        else:
+            count += 1
+    return count
+
+
+def warm_up_static():
+    """ Load the static files storage (and its manifest). """
+    staticfiles_storage.base_url
+
+
+def warm_up_requests(application):
+    """ GET settings.WARMUP_PATHS through a WSGI application, return response statuses. """
+    host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')),
+                'localhost')
+    factory = RequestFactory(HTTP_HOST=host)
+    statuses = []
+    for path in settings.WARMUP_PATHS:
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(status.split()[0])
+
+        try:
+            response = application(factory.get(path).environ, start_response)
+            for _ in response:
+                pass
+            response.close()
+        except Exception:
+            logger.exception("Warm-up request of %s failed", path)
+    return statuses
+
+
+def warm_up_databases():
+    """ Open a connection to every database. """
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def warm_up(databases=True, application=None, close_connections=False):
+    """ Warm up everything (requests only given an application), return time taken in seconds. """
+    started = time.perf_counter()
+    warm_up_urls()
+    templates = warm_up_templates()
+    warm_up_static()
+    if databases:
+        warm_up_databases()
+    statuses = warm_up_requests(application) if application is not None else []
+    if databases and close_connections:
+        for connection in connections.all():
+            connection.close()
+    elapsed = time.perf_counter() - started
+    logger.info("Warmed up URLs, %d templates, static files%s%s in %.1fms", templates,
+                ", databases" if databases else "",
+                f", requests ({' '.join(statuses)})" if statuses else "", elapsed * 1000)
+    return elapsed
+
+
+def rss_bytes():
+    """ Resident memory of this process (peak resident memory where /proc is missing). """
+    try:
+        with open(f'/proc/{os.getpid()}/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def pss_bytes():
+    """ Proportional set size (pages shared with forked workers count partially), None without /proc. """
+    try:
+        with open(f'/proc/{os.getpid()}/smaps_rollup') as smaps:
+            for line in smaps:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
@@ -0,0 +1,155 @@
+""" Read-only JSON API for topics and entries.
+
+Every endpoint accepts `?fields=a,b,c` to select the returned fields
+(only those columns are read from the database). Lists are keyset
+paginated like the HTML views (`?cursor=`), visibility rules are the
+same: own topics of the authenticated user plus public topics.
+"""
+
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.db.models.expressions import Window
+from django.db.models.functions import RowNumber
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from .compression import decompressed
+from .models import Topic, Entry
+from .pagination import KeysetPaginator, MergedKeysetPaginator, get_page_or_404
+
+# API field name -> model field name
+TOPIC_FIELDS = {
+    'id': 'id',
+    'user': 'user_id',
+    'text': 'text',
+    'date_added': 'date_added',
+    'public': 'public',
+    'entry_count': 'entry_count',
+    'last_entry_at': 'last_entry_at',
+}
+ENTRY_FIELDS = {
+    'id': 'id',
+    'topic': 'topic_id',
+    'text': 'text',
+    'date_added': 'date_added',
+}
+
+
+class InvalidParameter(Exception):
+    """ Invalid query parameter, answered with 400 and a JSON error. """
+
+
+def api_view(view):
+    """ Turn InvalidParameter raised by view into a 400 JSON response. """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except InvalidParameter as error:
+            return JsonResponse({'error': str(error)}, status=400)
+    return wrapper
+
+
+def requested_fields(request, available):
+    """ Return API field names selected by ?fields= (all by default). """
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(available)
+    fields = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise InvalidParameter(f"Unknown fields: {', '.join(unknown)}.")
+    return fields
+
+
+def project(row, fields, available):
+    """ API representation of a .values() row or model instance. """
+    if isinstance(row, dict):
+        # Compressed entry texts of .values() rows aren't decompressed yet
+        return {name: decompressed(row[available[name]]) for name in fields}
+    return {name: getattr(row, available[name]) for name in fields}
+
+
+def paginated_response(page, fields, available):
+    return JsonResponse({
+        'results': [project(row, fields, available) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@api_view
+def topics(request):
+    """ Topics visible to the user ordered by date_added. """
+    fields = requested_fields(request, TOPIC_FIELDS)
+    ordering = ('date_added', 'id')
+    columns = {TOPIC_FIELDS[name] for name in fields} | {'date_added', 'id'}
+    # `public IN (1)` rather than `WHERE public` lets SQLite use the index
+    public_topics = Topic.objects.active().filter(public__in=[True]).values(*columns)
+    if request.user.is_authenticated:
+        user_topics = Topic.objects.active().filter(user=request.user).values(*columns)
+        paginator = MergedKeysetPaginator([user_topics, public_topics], ordering, settings.TOPICS_PER_PAGE)
+    else:
+        paginator = KeysetPaginator(public_topics, ordering, settings.TOPICS_PER_PAGE)
+    page = get_page_or_404(paginator, request.GET.get('cursor'))
+    return paginated_response(page, fields, TOPIC_FIELDS)
+
+
+def visible_topic_or_404(request, topic_id):
+    """ Topic (id, owner and visibility only) if the user may read it. """
+    topic = get_object_or_404(Topic.objects.active().only('id', 'user_id', 'public'), id=topic_id)
+    if not topic.public and topic.user_id != request.user.id:
+        raise Http404
+    return topic
+
+
+@api_view
+def topic_entries(request, topic_id):
+    """ Entries of a topic, newest first. """
+    topic = visible_topic_or_404(request, topic_id)
+    fields = requested_fields(request, ENTRY_FIELDS)
+    columns = {ENTRY_FIELDS[name] for name in fields} | {'date_added', 'id'}
+    entries = Entry.objects.filter(topic=topic).values(*columns)
+    paginator = KeysetPaginator(entries, ('-date_added', '-id'), settings.ENTRIES_PER_PAGE)
+    page = get_page_or_404(paginator, request.GET.get('cursor'))
+    return paginated_response(page, fields, ENTRY_FIELDS)
+
+
+@api_view
+def entries_batch(request):
+    """ Newest entries of several topics (`?topics=1,2,3&limit=10`) in one query.
+
+    Topics that don't exist or aren't visible to the user are left out.
+    """
+    try:
+        topic_ids = {int(value) for value in request.GET.get('topics', '').split(',') if value}
+        limit = int(request.GET.get('limit', settings.ENTRIES_PER_PAGE))
+    except ValueError:
+        raise InvalidParameter("topics and limit must be integers.")
+    if not topic_ids or len(topic_ids) > settings.API_BATCH_MAX_TOPICS:
+        raise InvalidParameter(f"Give 1 to {settings.API_BATCH_MAX_TOPICS} topics.")
+    if not 1 <= limit <= settings.ENTRIES_PER_PAGE:
+        raise InvalidParameter(f"limit must be between 1 and {settings.ENTRIES_PER_PAGE}.")
+    fields = requested_fields(request, ENTRY_FIELDS)
+
+    # Visibility is checked in the same query (join on topic)
+    visible = Q(topic__public=True)
+    if request.user.is_authenticated:
+        visible |= Q(topic__user=request.user)
+    columns = {ENTRY_FIELDS[name] for name in fields} | {'id', 'topic_id'}
+    entries = Entry.objects.filter(visible, topic_id__in=topic_ids, topic__deleted_at=None).only(*columns).annotate(
+        row_number=Window(RowNumber(), partition_by=[F('topic_id')],
+                          order_by=[F('date_added').desc(), F('id').desc()]),
+    )
+    # Window results can't be filtered by the ORM, wrap the query instead
+    sql, params = entries.query.get_compiler(using=entries.db).as_sql()
+    ranked = Entry.objects.raw(
+        f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s ORDER BY topic_id, row_number',
+        [*params, limit],
+    )
+    results = {}
+    for entry in ranked:
+        results.setdefault(str(entry.topic_id), []).append(project(entry, fields, ENTRY_FIELDS))
+    return JsonResponse({'results': results})
@@ -0,0 +1,61 @@
+""" Async versions of the read-heavy views for ASGI deployment (learning_log/asgi.py).
+
+Under ASGI Django 3.2 runs every sync view in one shared thread. These
+views run in parallel instead (with the hybrid middleware of
+learning_log/middleware.py, the chain before them stays async): the index
+page only needs the user resolved, topic pages run the sync views
+(conditional GET, cache, pagination) in worker threads. ASYNC_DB_THREAD_SENSITIVE picks between
+the thread pool (parallel, default) and the single shared thread.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.shortcuts import render
+
+from . import views
+
+
+def database_sync_to_async(function):
+    """ sync_to_async() for database work.
+
+    Pool threads close stale connections like requests do (the shared
+    thread is already handled by Django's request signals).
+    """
+    if settings.ASYNC_DB_THREAD_SENSITIVE:
+        return sync_to_async(function, thread_sensitive=True)
+
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def _load_user(request):
+    """ Resolve lazy request.user (session and user queries). """
+    return request.user.is_authenticated
+
+
+async def index(request):
+    """ Learning logs Django web application home page. """
+    # Template only needs the user (navigation), render on the event loop
+    await database_sync_to_async(_load_user)(request)
+    return render(request, 'learning_logs/index.html')
+
+
+async def topics(request):
+    """ Topics list rendered in a worker thread. """
+    return await database_sync_to_async(views.topics)(request)
+
+
+async def topic(request, topic_id):
+    """ Topic page rendered in a worker thread. """
+    return await database_sync_to_async(views.topic)(request, topic_id)
+
+
+async def export_topic(request, topic_id, fmt):
+    """ Topic download written out in a worker thread (see views.export_topic). """
+    return await database_sync_to_async(views.export_topic)(request, topic_id, fmt)
@@ -0,0 +1,49 @@
+""" Helpers for bulk loading topics and entries. """
+
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from . import tasks
+from .cache import bump_topic_version
+from .models import Entry
+
+
+@contextmanager
+def keep_auto_now_add(*models):
+    """ Let bulk_create() store explicit values of auto_now_add fields.
+
+    Changes the model fields for the whole process, so it is only meant
+    for single threaded management commands.
+    """
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def create_entries(topic, texts, using=DEFAULT_DB_ALIAS):
+    """ Add entries with texts to topic with one bulk_create() in one transaction, return them. """
+    with transaction.atomic(using=using):
+        entries = Entry.objects.using(using).bulk_create([Entry(topic=topic, text=text) for text in texts])
+        if entries and entries[0].pk is None:
+            # Databases that don't return ids of inserted rows (SQLite): ours
+            # are the newest of the topic, as the insert holds the write lock
+            ids = Entry.objects.using(using).filter(topic=topic).order_by('-id').values_list('id', flat=True)
+            for entry, pk in zip(entries, reversed(list(ids[:len(entries)]))):
+                entry.pk = pk
+        ids = [entry.pk for entry in entries]
+
+        # bulk_create() sends no signals, same updates as signals.py (once for all entries)
+        transaction.on_commit(lambda: bump_topic_version(topic.id), using=using)
+        tasks.render_entries.enqueue(ids, using=using)
+        tasks.index_entries.enqueue(ids, using=using)
+        if entries:
+            last_added_at = max(entry.date_added for entry in entries)
+            tasks.count_entries.enqueue(topic.id, len(entries), last_added_at.isoformat(), using=using)
+    return entries
@@ -0,0 +1,106 @@
+""" Version counters used to key cached pages and fragments.
+
+Cached fragments are never deleted. Instead every write to a topic or its
+entries bumps the topic version, which is part of the fragment cache key,
+so the next read misses the stale fragment and renders a fresh one.
+
+Versions are nanosecond timestamps of the last change (too fine for
+Last-Modified, pages only send ETags, see views.py). A version younger than
+settings.REPLICA_PIN_SECONDS sends the request's reads to the primary
+database, so nothing older than the version is rendered from a lagging
+replica and cached under it.
+
+The same counters are the surrogate keys of whole pages cached for
+anonymous visitors (page_cache.py): 'topic-<id>' is the topic version and
+'topics-public' the version of the public topics list, so bumping a
+version purges every page tagged with its key.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from learning_log.routers import pin_to_primary
+
+TOPICS_VERSION_KEY = 'learning_logs:topics-version'
+PUBLIC_TOPICS_VERSION_KEY = 'learning_logs:public-topics-version'
+
+
+def _cache():
+    return caches[settings.TOPIC_CACHE_ALIAS]
+
+
+def _version_key(topic_id):
+    return f'learning_logs:topic-version:{topic_id}'
+
+
+def _version(key):
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        # Counter starts from the clock, so a counter lost to eviction or
+        # restart never comes back with a version that is still cached
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    if time.time_ns() - version < settings.REPLICA_PIN_SECONDS * 10**9:
+        pin_to_primary()
+    return version
+
+
+def _bump(key):
+    cache = _cache()
+    # Never go back in time even if clocks of servers differ
+    version = max(time.time_ns(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, None)
+
+
+def topic_version(topic_id):
+    """ Return current version of the topic's cached fragments. """
+    return _version(_version_key(topic_id))
+
+
+def bump_topic_version(topic_id):
+    """ Invalidate the topic's cached fragments. """
+    _bump(_version_key(topic_id))
+
+
+def topics_version():
+    """ Return current version of the topics list. """
+    return _version(TOPICS_VERSION_KEY)
+
+
+def bump_topics_version():
+    """ Mark the topics list changed (topic added, removed or edited, entry counts). """
+    _bump(TOPICS_VERSION_KEY)
+
+
+def public_topics_version():
+    """ Return current version of the list of public topics (anonymous topics list). """
+    return _version(PUBLIC_TOPICS_VERSION_KEY)
+
+
+def bump_public_topics_version():
+    """ Mark the public topics list changed (a public topic changed or was made private). """
+    _bump(PUBLIC_TOPICS_VERSION_KEY)
+
+
+def _surrogate_version_key(key):
+    if key == 'topics-public':
+        return PUBLIC_TOPICS_VERSION_KEY
+    kind, _, topic_id = key.partition('-')
+    if kind != 'topic' or not topic_id.isdigit():
+        raise ValueError(f"Unknown surrogate key {key!r}.")
+    return _version_key(topic_id)
+
+
+def surrogate_key_version(key):
+    """ Return current version of a surrogate key ('topic-<id>' or 'topics-public'). """
+    return _version(_surrogate_version_key(key))
+
+
+def surrogate_keys_purged(versions):
+    """ True if a key of {surrogate key: version} was purged since (bumped or evicted). """
+    version_keys = {key: _surrogate_version_key(key) for key in versions}
+    current = _cache().get_many(version_keys.values())
+    return any(current.get(version_keys[key]) != version for key, version in versions.items())
@@ -0,0 +1,157 @@
+""" Transparently compressed text storage (used for Entry.text).
+
+CompressedTextField stores text in a binary column, compressed when its
+UTF-8 encoding is at least settings.ENTRY_COMPRESSION_THRESHOLD bytes and
+compression makes it smaller. The first byte tells how the rest is stored:
+
+- PLAIN: UTF-8
+- ZLIB: zlib compressed UTF-8
+- ZSTD: Zstandard compressed UTF-8 (needs the optional `zstandard` package)
+
+settings.ENTRY_COMPRESSION selects the method of newly saved texts, stored
+rows keep theirs until they are saved again. Compressed values are loaded
+from the database as CompressedText and decompressed the first time the
+model attribute is read, so rows whose text isn't used (lists, counters)
+don't pay for decompression. .values() rows contain CompressedText as is,
+pass them through decompressed().
+"""
+
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+# Format header byte
+PLAIN = b'\x00'
+ZLIB = b'\x01'
+ZSTD = b'\x02'
+
+METHODS = ('zlib', 'zstd')
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as error:
+        raise ImproperlyConfigured("Zstandard compressed text requires the zstandard package.") from error
+    return zstandard
+
+
+def compress(text, method=None, threshold=None):
+    """ Encode text for storage in the given (default: configured) method. """
+    method = method or settings.ENTRY_COMPRESSION
+    threshold = settings.ENTRY_COMPRESSION_THRESHOLD if threshold is None else threshold
+    data = text.encode()
+    if len(data) < threshold:
+        return PLAIN + data
+    if method == 'zlib':
+        compressed = ZLIB + zlib.compress(data, 6)
+    elif method == 'zstd':
+        compressed = ZSTD + _zstandard().ZstdCompressor(level=3).compress(data)
+    else:
+        raise ImproperlyConfigured(f"ENTRY_COMPRESSION must be one of {', '.join(METHODS)}, not {method!r}.")
+    # Short or random texts can grow
+    return compressed if len(compressed) < len(data) + 1 else PLAIN + data
+
+
+def decompress(data):
+    """ Decode text stored by compress(). """
+    header, payload = data[:1], data[1:]
+    if header == PLAIN:
+        return payload.decode()
+    if header == ZLIB:
+        return zlib.decompress(payload).decode()
+    if header == ZSTD:
+        return _zstandard().ZstdDecompressor().decompress(payload).decode()
+    raise ValueError(f"Unknown compressed text header {header!r}.")
+
+
+class CompressedText:
+    """ Compressed text loaded from the database, str() decompresses it. """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return decompress(self.data)
+
+    def __eq__(self, other):
+        if isinstance(other, CompressedText):
+            return self.data == other.data
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.data)
+
+    def __repr__(self):
+        return f'<CompressedText: {len(self.data)} bytes>'
+
+
+def decompressed(value):
+    """ Text of a CompressedText (e.g. from a .values() row), other values unchanged. """
+    return str(value) if isinstance(value, CompressedText) else value
+
+
+def stored_data(value):
+    """ Bytes stored in the database for a loaded CompressedTextField value. """
+    if isinstance(value, CompressedText):
+        return value.data
+    return PLAIN + value.encode()
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """ Decompress the loaded value on first access (and keep the text). """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, CompressedText):
+            value = instance.__dict__[self.field.attname] = str(value)
+        return value
+
+    def __set__(self, instance, value):
+        # A data descriptor, so __get__ runs even when the value is loaded
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """ TextField stored compressed in a binary column (forms are unchanged). """
+
+    descriptor_class = CompressedTextDescriptor
+
+    def get_internal_type(self):
+        # Column type and database conversions of BinaryField
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        value = bytes(value)
+        # Plain text costs nothing to decode
+        if value[:1] == PLAIN:
+            return value[1:].decode()
+        return CompressedText(value)
+
+    def to_python(self, value):
+        if isinstance(value, CompressedText):
+            return str(value)
+        return super().to_python(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        if isinstance(value, CompressedText):
+            # Unchanged, store as loaded
+            return value.data
+        return compress(super().get_prep_value(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is not None:
+            return connection.Database.Binary(value)
+        return value
@@ -0,0 +1,50 @@
+""" Denormalized entry statistics of topics (Topic.entry_count, Topic.last_entry_at).
+
+Counters are changed with single UPDATE statements using F() expressions
+(from background tasks, tasks.py), so concurrent writes never lose an
+increment and a write costs the same whatever the topic size. reconcile()
+recomputes them from the entries table for bulk imports and drift repair.
+"""
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Case, Count, DateTimeField, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Topic, Entry
+
+
+def _latest_entry_date():
+    """ Subquery with date_added of the newest entry of the outer topic. """
+    latest = Entry.objects.filter(topic=OuterRef('pk')).order_by('-date_added', '-id')
+    return Subquery(latest.values('date_added')[:1])
+
+
+def entries_added(topic_id, count, last_added_at, using=DEFAULT_DB_ALIAS):
+    """ Count count new entries in their topic, the newest added at last_added_at. """
+    date_added = Value(last_added_at, output_field=DateTimeField())
+    Topic.objects.using(using).filter(id=topic_id).update(
+        entry_count=F('entry_count') + count,
+        # Newest of the stored and the new date (stored may be NULL)
+        last_entry_at=Case(When(last_entry_at__gte=date_added, then=F('last_entry_at')), default=date_added),
+    )
+
+
+def entries_removed(topic_id, count, using=DEFAULT_DB_ALIAS):
+    """ Uncount count deleted entries from their topic. """
+    Topic.objects.using(using).filter(id=topic_id).update(
+        entry_count=F('entry_count') - count,
+        # From the (topic, -date_added) index
+        last_entry_at=_latest_entry_date(),
+    )
+
+
+def reconcile(topics=None):
+    """ Recompute counters of topics (all topics by default) from their entries. """
+    if topics is None:
+        topics = Topic.objects.all()
+    entry_count = Entry.objects.filter(topic=OuterRef('pk')).order_by().values('topic')
+    entry_count = entry_count.annotate(count=Count('*')).values('count')
+    return topics.update(
+        entry_count=Coalesce(Subquery(entry_count), 0),
+        last_entry_at=_latest_entry_date(),
+    )
@@ -0,0 +1,71 @@
+""" Deletion of topics in two steps.
+
+Deleting a topic with Django's cascade removes all its entries in one
+transaction, which holds locks for as long as a big topic takes. Instead
+delete_topic() only marks the topic deleted (hidden from every view by
+TopicQuerySet.active()) and enqueues purge_topic(), which removes the
+entries in batches of settings.TOPIC_PURGE_BATCH_SIZE, each in its own
+short transaction (it must not run inside an atomic block, run_worker runs
+tasks outside its claiming transaction), and finally the topic row. A purge
+interrupted at any point continues where it stopped when run again (the
+`purge_topics` command runs the purge of every deleted topic).
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .models import Topic, Entry
+from .search import get_backend
+
+logger = logging.getLogger(__name__)
+
+
+def delete_topic(topic):
+    """ Hide the topic at once and enqueue the purge of its entries. """
+    # tasks imports this module
+    from . import tasks
+
+    topic.deleted_at = timezone.now()
+    # Signals drop cached pages of the topic and the topics list
+    topic.save(update_fields=['deleted_at'])
+    tasks.purge_topic.enqueue(topic.id)
+
+
+def purge_topic(topic_id, batch_size=None, using=DEFAULT_DB_ALIAS, progress=None):
+    """ Remove a deleted topic's entries in batches, then the topic. Return entries removed.
+
+    progress(removed, remaining) is called after every batch.
+    """
+    batch_size = batch_size or settings.TOPIC_PURGE_BATCH_SIZE
+    topic = Topic.objects.using(using).deleted().filter(id=topic_id).first()
+    if topic is None:
+        # Purged already (or not deleted)
+        return 0
+
+    entries = Entry.objects.using(using).filter(topic_id=topic_id)
+    # Deleted topics get no new entries
+    total = entries.count()
+    search = get_backend(using)
+    table = connections[using].ops.quote_name(Entry._meta.db_table)
+    removed = 0
+    while True:
+        with transaction.atomic(using=using):
+            ids = list(entries.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            search.remove(ids)
+            # One DELETE without loading the rows, per entry signals would
+            # enqueue per entry tasks for a topic that is going away
+            with connections[using].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {table} WHERE id IN ({", ".join(["%s"] * len(ids))})', ids)
+        removed += len(ids)
+        remaining = total - removed
+        logger.info("Purged %d entries of topic %d, %d remaining", removed, topic_id, remaining)
+        if progress is not None:
+            progress(removed, remaining)
+
+    topic.delete()
+    return removed
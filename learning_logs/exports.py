@@ -0,0 +1,104 @@
+""" Serialization of topics and entries (JSON lines, Markdown, CSV).
+
+Generators take entries as an iterator of rows and yield at least one
+piece per entry, so a download holds the rows of one fetch in memory
+(settings.EXPORT_CHUNK_SIZE, each with its whole compressed text) plus
+one decompressed text. Texts are stored compressed (compression.py) and
+can't be read from the database in parts.
+"""
+
+import csv
+import json
+import tempfile
+
+from .compression import decompressed
+from .models import Topic, Entry
+
+TOPIC_FIELDS = ('id', 'user__username', 'text', 'date_added', 'public')
+ENTRY_FIELDS = ('id', 'topic_id', 'text', 'date_added')
+
+
+def topic_record(values):
+    """ Record of a Topic from .values(*TOPIC_FIELDS) row. """
+    return {
+        'model': 'topic',
+        'id': values['id'],
+        'user': values['user__username'],
+        'text': values['text'],
+        'date_added': values['date_added'].isoformat(),
+        'public': values['public'],
+    }
+
+
+def entry_record(values):
+    """ Record of an Entry from .values(*ENTRY_FIELDS) row. """
+    return {
+        'model': 'entry',
+        'id': values['id'],
+        'topic': values['topic_id'],
+        'text': decompressed(values['text']),
+        'date_added': values['date_added'].isoformat(),
+    }
+
+
+def iter_records(chunk_size=2000, using='default'):
+    """ Yield records of all topics, then all entries, reading in chunks. """
+    # Deleted topics are left out
+    topics = Topic.objects.using(using).active().order_by('id').values(*TOPIC_FIELDS)
+    for values in topics.iterator(chunk_size=chunk_size):
+        yield topic_record(values)
+    entries = Entry.objects.using(using).filter(topic__deleted_at=None).order_by('id').values(*ENTRY_FIELDS)
+    for values in entries.iterator(chunk_size=chunk_size):
+        yield entry_record(values)
+
+
+def dumps(record):
+    """ One JSON line of a record. """
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def iter_markdown(topic, entries):
+    """ Yield Markdown document of topic with entries (ENTRY_FIELDS rows). """
+    yield f"# {topic.text}\n"
+    for values in entries:
+        yield f"\n## {values['date_added']:%b %d, %Y %H:%M}\n\n"
+        yield decompressed(values['text'])
+        yield "\n"
+
+
+def iter_jsonl(topic, entries):
+    """ Yield JSON lines of entries (ENTRY_FIELDS rows). """
+    for values in entries:
+        yield dumps(entry_record(values))
+
+
+class _Echo:
+    """ File-like object returning written value (csv writer to generator). """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(topic, entries):
+    """ Yield CSV rows of entries (ENTRY_FIELDS rows) with a header. """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['id', 'date_added', 'text'])
+    for values in entries:
+        yield writer.writerow([values['id'], values['date_added'].isoformat(), decompressed(values['text'])])
+
+
+def spool(pieces, max_size):
+    """ Rewound temporary file of the encoded pieces, in memory up to max_size bytes. """
+    file = tempfile.SpooledTemporaryFile(max_size=max_size)
+    for piece in pieces:
+        file.write(piece.encode())
+    file.seek(0)
+    return file
+
+
+# Download format -> (generator, content type, file extension)
+FORMATS = {
+    'md': (iter_markdown, 'text/markdown; charset=utf-8', 'md'),
+    'jsonl': (iter_jsonl, 'application/jsonl; charset=utf-8', 'jsonl'),
+    'csv': (iter_csv, 'text/csv; charset=utf-8', 'csv'),
+}
@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 from .models import Topic, Entry
 
 class TopicForm(forms.ModelForm):
@@ -14,3 +15,9 @@ class EntryForm(forms.ModelForm):
         fields = ['text']
         labels = {'text': 'Entry text:'}
         widgets = {'text': forms.Textarea(attrs={'cols': 80})}
+
+# Several new entries at once (views.new_entries), empty forms are left out
+EntryFormSet = forms.formset_factory(
+    EntryForm, extra=settings.BULK_ENTRIES_EXTRA - 1, min_num=1, validate_min=True,
+    max_num=settings.BULK_ENTRIES_MAX, validate_max=True,
+)
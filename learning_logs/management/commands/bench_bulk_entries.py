@@ -0,0 +1,88 @@
+""" Benchmark of adding many entries: one request per entry against one bulk request. """
+
+import json
+import random
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from learning_log.metrics import QueryRecorder
+from learning_logs.deletion import purge_topic
+from learning_logs.models import Topic, Entry
+
+WORDS = "note django python entry topic list search cache query index page form view model".split()
+
+
+class Command(BaseCommand):
+    help = ("Add the same entries to a topic with one new_entry POST each, one formset POST and one "
+            "JSON POST to new_entries, and compare time and queries. Uses a throwaway user and topics.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=200,
+                            help="Entries added per mode.")
+        parser.add_argument('--words', type=int, default=50,
+                            help="Words per entry text.")
+
+    def handle(self, *args, **options):
+        count = options['entries']
+        if not 1 <= count <= settings.BULK_ENTRIES_MAX:
+            raise CommandError(f"--entries must be between 1 and BULK_ENTRIES_MAX ({settings.BULK_ENTRIES_MAX}).")
+        rng = random.Random(0)
+        texts = [' '.join(rng.choices(WORDS, k=options['words'])) for _ in range(count)]
+
+        password = uuid.uuid4().hex
+        user = User.objects.create_user(username=f'bench-bulk-{uuid.uuid4().hex[:8]}', password=password)
+        client = Client()
+        client.login(username=user.username, password=password)
+        try:
+            self.stdout.write(f"{count} entries of {options['words']} words, tasks backend {settings.TASKS_BACKEND!r}")
+            self.stdout.write(f"{'mode':>10} {'total':>10} {'per entry':>10} {'queries':>8} {'speedup':>8}")
+            baseline = None
+            for mode in ('per-entry', 'formset', 'json'):
+                topic = Topic.objects.create(user=user, text=f"Bench {mode}", public=False)
+                elapsed, queries = self._measure(client, mode, topic, texts)
+                if Entry.objects.filter(topic=topic).count() != count:
+                    raise CommandError(f"{mode} didn't add {count} entries.")
+                baseline = baseline or elapsed
+                self.stdout.write(f"{mode:>10} {elapsed * 1000:>8.1f}ms {elapsed / count * 1000:>8.3f}ms "
+                                  f"{queries:>8} {baseline / elapsed:>7.1f}x")
+        finally:
+            for topic in Topic.objects.filter(user=user):
+                topic.deleted_at = topic.date_added
+                topic.save(update_fields=['deleted_at'])
+                purge_topic(topic.id)
+            user.delete()
+
+    def _measure(self, client, mode, topic, texts):
+        """ Seconds and queries taken to add texts to topic. """
+        recorder = QueryRecorder(keep_sql=False)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            started = time.perf_counter()
+            if mode == 'per-entry':
+                url = reverse('learning_logs:new_entry', kwargs={'topic_id': topic.id})
+                for text in texts:
+                    self._check(client.post(url, {'text': text}), 302)
+            elif mode == 'formset':
+                url = reverse('learning_logs:new_entries', kwargs={'topic_id': topic.id})
+                data = {'form-TOTAL_FORMS': len(texts), 'form-INITIAL_FORMS': 0}
+                data.update((f'form-{index}-text', text) for index, text in enumerate(texts))
+                self._check(client.post(url, data), 302)
+            else:
+                url = reverse('learning_logs:new_entries', kwargs={'topic_id': topic.id})
+                body = json.dumps({'entries': [{'text': text} for text in texts]})
+                self._check(client.post(url, body, content_type='application/json'), 201)
+            elapsed = time.perf_counter() - started
+        return elapsed, recorder.count
+
+    def _check(self, response, status):
+        if response.status_code != status:
+            raise CommandError(f"Got status {response.status_code} instead of {status}.")
@@ -0,0 +1,101 @@
+""" Concurrency benchmark with slow clients against a running server.
+
+Start the server in one mode, run the benchmark, then repeat in the other:
+
+    gunicorn learning_log.wsgi --workers 2
+    gunicorn learning_log.asgi:application --workers 2 -k uvicorn.workers.UvicornWorker
+
+    python manage.py bench_concurrency http://127.0.0.1:8000/topics/ --clients 200
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ("Open many concurrent connections that send their requests and read "
+            "responses slowly, report latency percentiles and throughput.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help="URL to request (http only).")
+        parser.add_argument('--clients', type=int, default=100,
+                            help="Concurrent connections.")
+        parser.add_argument('--requests', type=int, default=5,
+                            help="Requests per client (one connection each).")
+        parser.add_argument('--send-delay', type=float, default=0.5,
+                            help="Seconds a client takes to trickle its request headers.")
+        parser.add_argument('--read-delay', type=float, default=0.01,
+                            help="Pause between reads of 4 KiB response pieces.")
+        parser.add_argument('--timeout', type=float, default=60,
+                            help="Per-request timeout in seconds.")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError("Only http:// URLs are supported.")
+        self.options = options
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.path = (url.path or '/') + (f'?{url.query}' if url.query else '')
+        report = asyncio.run(self._run())
+        self.stdout.write(json.dumps(report, indent=2))
+
+    async def _run(self):
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._client() for _ in range(self.options['clients'])))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for client in results for latency in client if latency is not None)
+        failed = sum(latency is None for client in results for latency in client)
+        report = {
+            'url': self.options['url'],
+            'clients': self.options['clients'],
+            'requests': len(latencies) + failed,
+            'failed': failed,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+        }
+        if latencies:
+            quantiles = statistics.quantiles(latencies, n=100)
+            report.update({
+                'p50_ms': round(quantiles[49] * 1000, 1),
+                'p95_ms': round(quantiles[94] * 1000, 1),
+                'p99_ms': round(quantiles[98] * 1000, 1),
+            })
+        return report
+
+    async def _client(self):
+        latencies = []
+        for _ in range(self.options['requests']):
+            try:
+                latency = await asyncio.wait_for(self._request(), self.options['timeout'])
+            except (OSError, asyncio.TimeoutError):
+                latency = None
+            latencies.append(latency)
+        return latencies
+
+    async def _request(self):
+        """ One slow request, return its latency or None on a non-200 answer. """
+        started = time.perf_counter()
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            request = (f'GET {self.path} HTTP/1.1\r\nHost: {self.host}\r\n'
+                       f'User-Agent: bench_concurrency\r\nConnection: close\r\n\r\n').encode()
+            # Trickle the request in 8 pieces
+            piece = -(-len(request) // 8)
+            for start in range(0, len(request), piece):
+                writer.write(request[start:start + piece])
+                await writer.drain()
+                await asyncio.sleep(self.options['send_delay'] / 8)
+            status_line = await reader.readline()
+            while await reader.read(4096):
+                await asyncio.sleep(self.options['read_delay'])
+        finally:
+            writer.close()
+        if b' 200 ' not in status_line:
+            return None
+        return time.perf_counter() - started
@@ -0,0 +1,68 @@
+""" Benchmark of database connection handling per request. """
+
+import copy
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+
+POOLING_ENGINE = 'learning_log.db.backends.postgresql'
+
+# Mode name, settings overrides, PostgreSQL backend only
+MODES = (
+    ('new connection', {'CONN_MAX_AGE': 0}, False),
+    ('persistent', {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': False}, False),
+    ('persistent+check', {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': True}, True),
+    ('pooled+check', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'POOL_SIZE': 1}, True),
+)
+
+
+class Command(BaseCommand):
+    help = ("Time the connection handling Django does around each request (connect or reuse, "
+            "health check, close or return to the pool) plus a trivial query, per connection mode.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Simulated requests per mode.")
+        parser.add_argument('--queries', type=int, default=1,
+                            help="SELECT 1 queries per simulated request.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        self.options = options
+        alias = options['database']
+        settings_dict = connections[alias].settings_dict
+        self.stdout.write(f"{connections[alias].vendor} database {alias!r}, "
+                          f"{options['requests']} requests of {options['queries']} queries")
+        self.stdout.write(f"{'mode':>18} {'median':>10} {'p95':>10}")
+        for name, overrides, postgresql_only in MODES:
+            if postgresql_only and settings_dict['ENGINE'] != POOLING_ENGINE:
+                self.stdout.write(f"{name:>18} {'(PostgreSQL only)':>21}")
+                continue
+            timings = self._measure(f'{alias}-bench-{name}', {**copy.deepcopy(settings_dict), **overrides})
+            self.stdout.write(f"{name:>18} {statistics.median(timings) * 1000:>8.3f}ms "
+                              f"{statistics.quantiles(timings, n=20)[-1] * 1000:>8.3f}ms")
+
+    def _measure(self, alias, settings_dict):
+        """ Wall time of each simulated request on a separate connection wrapper. """
+        connection = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias)
+        timings = []
+        try:
+            for _ in range(self.options['requests']):
+                started = time.perf_counter()
+                # What request_started and request_finished do (close_old_connections)
+                connection.close_if_unusable_or_obsolete()
+                for _ in range(self.options['queries']):
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                        cursor.fetchone()
+                connection.close_if_unusable_or_obsolete()
+                timings.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+            pool = getattr(connection, 'pool', None)
+            if pool is not None:
+                pool.close()
+        return timings
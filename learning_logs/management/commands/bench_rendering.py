@@ -0,0 +1,59 @@
+""" Microbenchmark of entry text rendering per page view. """
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from learning_logs.models import Entry
+from learning_logs.rendering import render_text
+
+# Entry body of topic.html before and after Entry.text_html
+LINEBREAKS = Template("{% for entry in entries %}{{ entry.text|linebreaks }}{% endfor %}")
+STORED = Template("{% for entry in entries %}{{ entry.text_html|safe }}{% endfor %}")
+
+
+class Command(BaseCommand):
+    help = ("Time rendering entry text with the linebreaks filter against emitting "
+            "stored Entry.text_html, per entry.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=1000,
+                            help="Entries rendered per run (newest entries of the database).")
+        parser.add_argument('--words', type=int, default=200,
+                            help="Words per synthetic entry if the database has no entries.")
+        parser.add_argument('--repeat', type=int, default=20,
+                            help="Timed runs (median is reported).")
+
+    def handle(self, *args, **options):
+        self.options = options
+        entries = list(Entry.objects.order_by('-id')[:options['entries']])
+        if not entries:
+            paragraph = ' '.join(['word <tag> & more'] * (options['words'] // 4))
+            text = f"{paragraph}\n{paragraph}\n\n{paragraph}"
+            entries = [Entry(text=text, text_html=render_text(text)) for _ in range(options['entries'])]
+        for entry in entries:
+            if not entry.text_html:
+                entry.text_html = render_text(entry.text)
+
+        count = len(entries)
+        context = Context({'entries': entries})
+        filtered = self._time(lambda: LINEBREAKS.render(context)) / count
+        stored = self._time(lambda: STORED.render(context)) / count
+        average = sum(len(entry.text) for entry in entries) / count
+        self.stdout.write(f"{count} entries, {average:.0f} characters on average")
+        self.stdout.write(f"{'linebreaks':>12} {filtered * 1e6:>10.2f}us/entry")
+        self.stdout.write(f"{'text_html':>12} {stored * 1e6:>10.2f}us/entry")
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved {(filtered - stored) * 1e6:.2f}us per entry ({filtered / max(stored, 1e-12):.1f}x)."
+        ))
+
+    def _time(self, function):
+        """ Median wall time of function() in seconds. """
+        runs = []
+        for _ in range(self.options['repeat']):
+            started = time.perf_counter()
+            function()
+            runs.append(time.perf_counter() - started)
+        return statistics.median(runs)
@@ -0,0 +1,85 @@
+""" Benchmark of the paginated topics list on a growing Topic table. """
+
+import random
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from learning_logs.models import Topic
+from learning_logs.pagination import NEXT, KeysetPaginator, MergedKeysetPaginator, encode_cursor
+
+
+class Command(BaseCommand):
+    help = ("Grow the Topic table step by step and time the topics list queries. "
+            "Runs inside a transaction that is rolled back at the end.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                            help="Table sizes (number of topics) to measure at.")
+        parser.add_argument('--public-ratio', type=float, default=0.5,
+                            help="Share of public topics.")
+        parser.add_argument('--repeat', type=int, default=20,
+                            help="Timed runs per measurement (median is reported).")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="bulk_create() batch size.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(0)
+        self.stdout.write(f"{'topics':>10} {'anonymous':>12} {'anon. deep':>12} {'user':>12} {'user deep':>12}")
+        with transaction.atomic():
+            prefix = uuid.uuid4().hex[:8]
+            self.users = [User.objects.create(username=f'bench-{prefix}-{number}') for number in range(10)]
+            created = 0
+            for size in sorted(self.options['sizes']):
+                created += self._grow(created, size - created)
+                self._measure(created)
+            # Leave the database as it was
+            transaction.set_rollback(True)
+
+    def _grow(self, start, count):
+        """ Bulk insert count topics spread over bench users. """
+        batch = []
+        for number in range(start, start + count):
+            public = self.rng.random() < self.options['public_ratio']
+            batch.append(Topic(user=self.users[number % len(self.users)], text=f"Topic {number}", public=public))
+            if len(batch) == self.options['batch_size']:
+                Topic.objects.bulk_create(batch)
+                batch = []
+        Topic.objects.bulk_create(batch)
+        return count
+
+    def _measure(self, size):
+        ordering = ('date_added', 'id')
+        per_page = settings.TOPICS_PER_PAGE
+        user = self.users[0]
+        # Same querysets as the topics view
+        public_topics = Topic.objects.active().filter(public__in=[True])
+        anonymous = KeysetPaginator(public_topics, ordering, per_page)
+        merged = MergedKeysetPaginator([Topic.objects.active().filter(user=user), public_topics], ordering, per_page)
+
+        # Cursor pointing to the middle of the table (found once, not timed)
+        middle = Topic.objects.active().order_by(*ordering)[size // 2]
+        deep_cursor = encode_cursor(NEXT, anonymous.key(middle))
+
+        timings = [
+            self._time(lambda: list(anonymous.page())),
+            self._time(lambda: list(anonymous.page(deep_cursor))),
+            self._time(lambda: list(merged.page())),
+            self._time(lambda: list(merged.page(deep_cursor))),
+        ]
+        self.stdout.write(f"{size:>10} " + " ".join(f"{timing * 1000:>10.2f}ms" for timing in timings))
+
+    def _time(self, function):
+        """ Median wall time of function() in seconds. """
+        runs = []
+        for _ in range(self.options['repeat']):
+            started = time.perf_counter()
+            function()
+            runs.append(time.perf_counter() - started)
+        return statistics.median(runs)
@@ -0,0 +1,143 @@
+""" Latency and query count benchmark of every view in learning_logs and users URLs. """
+
+import json
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from learning_log.metrics import QueryRecorder
+from learning_logs.models import Topic, Entry
+
+URLCONFS = ('learning_logs.urls', 'users.urls')
+# Views with side effects on the benchmark client
+SKIPPED = {'users:logout'}
+# Query strings of views that need one
+QUERIES = {
+    'learning_logs:api_entries_batch': 'topics={topic_id}',
+    'learning_logs:search': 'q=the',
+}
+
+
+def iter_url_names(urlconf):
+    """ Yield (namespaced URL name, pattern) of named patterns, following include(). """
+    def walk(patterns, namespace):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns, pattern.namespace or namespace)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                yield f'{namespace}:{pattern.name}', pattern
+    resolver = get_resolver(urlconf)
+    namespace = getattr(resolver.urlconf_module, 'app_name', None)
+    yield from walk(resolver.url_patterns, namespace)
+
+
+class Command(BaseCommand):
+    help = ("GET every named view of learning_logs.urls and users.urls as an anonymous "
+            "and an authenticated user, report latency percentiles and query counts as JSON. "
+            "Run against a database filled by seed_logs.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help="Timed requests per view and user.")
+        parser.add_argument('--username', default='seed0',
+                            help="User to log in as.")
+        parser.add_argument('--password', default='seed')
+        parser.add_argument('--topic-id', type=int,
+                            help="Topic for topic URLs (default: largest topic of the user).")
+        parser.add_argument('--output', '-o',
+                            help="Write the JSON report to this file instead of standard output.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']!r} doesn't exist, run seed_logs first.")
+        self.samples = self._samples(user)
+
+        anonymous = Client()
+        authenticated = Client()
+        if not authenticated.login(username=options['username'], password=options['password']):
+            raise CommandError("Can't log in, check --username and --password.")
+
+        report = {'requests': options['requests'], 'views': {}}
+        for urlconf in URLCONFS:
+            for name, pattern in iter_url_names(urlconf):
+                if name in SKIPPED:
+                    continue
+                url = self._reverse(name, pattern)
+                if url is None:
+                    self.stderr.write(f"Skipping {name}: no sample arguments.")
+                    continue
+                report['views'][name] = {
+                    'url': url,
+                    'anonymous': self._measure(anonymous, url),
+                    'authenticated': self._measure(authenticated, url),
+                }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def _samples(self, user):
+        """ URL arguments by name. """
+        topic_id = self.options['topic_id']
+        if topic_id is None:
+            topic = Topic.objects.active().filter(user=user).order_by('-entry_count').first()
+            if topic is None:
+                raise CommandError(f"User {user.username!r} has no topics.")
+            topic_id = topic.id
+        entry = Entry.objects.filter(topic_id=topic_id).order_by('-id').first()
+        return {
+            'topic_id': topic_id,
+            'entry_id': entry.id if entry else None,
+            'fmt': 'md',
+        }
+
+    def _reverse(self, name, pattern):
+        arguments = pattern.pattern.regex.groupindex
+        kwargs = {argument: self.samples.get(argument) for argument in arguments}
+        if any(value is None for value in kwargs.values()):
+            return None
+        url = reverse(name, kwargs=kwargs)
+        if name in QUERIES:
+            url += '?' + QUERIES[name].format(**self.samples)
+        return url
+
+    def _measure(self, client, url):
+        """ Latency percentiles (ms), query counts and status codes of GET url. """
+        # Warm up (template compilation, caches)
+        client.get(url)
+        timings = []
+        queries = []
+        statuses = set()
+        for _ in range(self.options['requests']):
+            recorder = QueryRecorder(keep_sql=False)
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    # Streaming bodies are produced while being read
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(recorder.count)
+            statuses.add(response.status_code)
+        quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        return {
+            'status': sorted(statuses),
+            'p50_ms': round(quantiles[49], 2),
+            'p95_ms': round(quantiles[94], 2),
+            'p99_ms': round(quantiles[98], 2),
+            'queries': max(queries),
+        }
@@ -0,0 +1,77 @@
+""" Report the space saved by compressed entry texts and rendered HTML. """
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from learning_logs.compression import CompressedText, compress, stored_data
+from learning_logs.models import Entry
+
+
+# Compressed columns of Entry
+FIELDS = ('text', 'text_html')
+
+
+def _mib(size):
+    return f"{size / 2**20:.1f}MiB"
+
+
+class Command(BaseCommand):
+    help = ("Compare the size of entry texts and rendered HTML with the bytes stored for them "
+            "(settings.ENTRY_COMPRESSION above ENTRY_COMPRESSION_THRESHOLD bytes).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recompress', action='store_true',
+                            help="Store texts and HTML again whose stored form differs from the current settings "
+                                 "(after changing ENTRY_COMPRESSION or its threshold).")
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Entries read (and updated) per batch.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+        # .values_list() keeps the stored form (CompressedText or plain str)
+        entries = Entry.objects.using(using).order_by('id').values_list('id', *FIELDS)
+
+        count = recompressed = 0
+        compressed = dict.fromkeys(FIELDS, 0)
+        original_bytes = dict.fromkeys(FIELDS, 0)
+        stored_bytes = dict.fromkeys(FIELDS, 0)
+        last_id = 0
+        while True:
+            batch = list(entries.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            changed = []
+            for pk, *values in batch:
+                count += 1
+                updates = {}
+                for field, value in zip(FIELDS, values):
+                    text = str(value)
+                    stored = stored_data(value)
+                    original_bytes[field] += len(text.encode())
+                    stored_bytes[field] += len(stored)
+                    compressed[field] += isinstance(value, CompressedText)
+                    if options['recompress']:
+                        data = compress(text)
+                        if data != stored:
+                            updates[field] = CompressedText(data)
+                if updates:
+                    changed.append((pk, updates))
+            if changed:
+                with transaction.atomic(using=using):
+                    for pk, updates in changed:
+                        Entry.objects.using(using).filter(id=pk).update(**updates)
+                recompressed += len(changed)
+            last_id = batch[-1][0]
+
+        saved = sum(original_bytes.values()) - sum(stored_bytes.values())
+        self.stdout.write(f"Method: {settings.ENTRY_COMPRESSION}, threshold {settings.ENTRY_COMPRESSION_THRESHOLD} bytes")
+        self.stdout.write(f"Entries: {count} ({compressed['text']} compressed, {compressed['text_html']} with compressed HTML)")
+        for field, label in (('text', "Text"), ('text_html', "HTML")):
+            ratio = stored_bytes[field] / original_bytes[field] if original_bytes[field] else 1
+            self.stdout.write(f"{label}: {_mib(original_bytes[field])}, stored: {_mib(stored_bytes[field])} ({ratio:.0%})")
+        self.stdout.write(self.style.SUCCESS(f"Saved {_mib(saved)}."))
+        if options['recompress']:
+            self.stdout.write(self.style.SUCCESS(f"Stored {recompressed} entries again, run the report again for their sizes."))
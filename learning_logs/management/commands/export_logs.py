@@ -0,0 +1,42 @@
+""" Stream all topics and entries to a JSON-lines file. """
+
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from learning_logs.exports import dumps, iter_records
+
+
+class Command(BaseCommand):
+    help = ("Export topics and entries as JSON lines (topics first). "
+            "Rows are read with a chunked iterator, so memory use doesn't grow with the table.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-',
+                            help="Output file ('-' for standard output).")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Rows fetched from the database at once.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database alias to export from.")
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            output = sys.stdout
+        else:
+            output = open(options['output'], 'w', encoding='utf-8')
+
+        started = time.perf_counter()
+        rows = 0
+        try:
+            for record in iter_records(options['chunk_size'], options['database']):
+                output.write(dumps(record))
+                rows += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        elapsed = time.perf_counter() - started
+        # Report on stderr, stdout may be the export itself
+        self.stderr.write(f"Exported {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s).")
@@ -0,0 +1,160 @@
+""" Load topics and entries from a JSON-lines file made by export_logs. """
+
+import json
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from learning_logs.bulk import keep_auto_now_add
+from learning_logs.cache import bump_topic_version
+from learning_logs.counters import entries_added
+from learning_logs.models import Topic, Entry
+from learning_logs.rendering import render_text
+from learning_logs.search import get_backend
+
+
+class Command(BaseCommand):
+    help = ("Import topics and entries from JSON lines with batched bulk_create(), "
+            "one transaction per batch. Primary keys are kept, topic owners are "
+            "matched by username.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-',
+                            help="Input file ('-' for standard input).")
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Rows inserted per bulk_create() and transaction.")
+        parser.add_argument('--create-users', action='store_true',
+                            help="Create missing users (with unusable passwords).")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database alias to import into.")
+
+    def handle(self, *args, **options):
+        self.using = options['database']
+        self.batch_size = options['batch_size']
+        self.create_users = options['create_users']
+        # username -> user id, grows with the number of distinct owners only
+        self.user_ids = {}
+        self.rows = 0
+        self.started = time.perf_counter()
+
+        if options['input'] == '-':
+            lines = sys.stdin
+        else:
+            lines = open(options['input'], encoding='utf-8')
+
+        batch = []
+        batch_model = None
+        try:
+            with keep_auto_now_add(Topic, Entry):
+                for number, line in enumerate(lines, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError as error:
+                        raise CommandError(f"Line {number}: {error}")
+                    if record.get('model') not in ('topic', 'entry'):
+                        raise CommandError(f"Line {number}: unknown model {record.get('model')!r}.")
+                    if record['model'] != batch_model or len(batch) == self.batch_size:
+                        self._flush(batch_model, batch)
+                        batch = []
+                        batch_model = record['model']
+                    batch.append(record)
+                self._flush(batch_model, batch)
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+
+        self._reset_sequences()
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.rows} rows in {elapsed:.1f}s ({self.rows / max(elapsed, 1e-9):.0f} rows/s)."
+        ))
+
+    def _flush(self, model, batch):
+        """ Insert one batch of records of the same model in a transaction. """
+        if not batch:
+            return
+        with transaction.atomic(using=self.using):
+            if model == 'topic':
+                self._import_topics(batch)
+            else:
+                self._import_entries(batch)
+        self.rows += len(batch)
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(f"... {self.rows} rows ({self.rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+    def _import_topics(self, records):
+        user_ids = self._resolve_users({record['user'] for record in records})
+        topics = [
+            Topic(
+                id=record['id'],
+                user_id=user_ids[record['user']],
+                text=record['text'],
+                date_added=parse_datetime(record['date_added']),
+                public=record['public'],
+            )
+            for record in records
+        ]
+        Topic.objects.using(self.using).bulk_create(topics)
+
+    def _import_entries(self, records):
+        entries = [
+            Entry(
+                id=record['id'],
+                topic_id=record['topic'],
+                text=record['text'],
+                # bulk_create() sends no signals, which render the text in a task
+                text_html=render_text(record['text']),
+                date_added=parse_datetime(record['date_added']),
+            )
+            for record in records
+        ]
+        Entry.objects.using(self.using).bulk_create(entries)
+
+        # bulk_create() sends no signals, update derived data here. Counters
+        # are incremented by the batch (recounting the topics would read
+        # every entry imported so far again, for every batch).
+        added = {}
+        for entry in entries:
+            count, last_added_at = added.get(entry.topic_id, (0, entry.date_added))
+            added[entry.topic_id] = (count + 1, max(last_added_at, entry.date_added))
+        for topic_id, (count, last_added_at) in added.items():
+            entries_added(topic_id, count, last_added_at, using=self.using)
+        get_backend(self.using).index(entries)
+
+        def bump():
+            for topic_id in added:
+                bump_topic_version(topic_id)
+        transaction.on_commit(bump, using=self.using)
+
+    def _resolve_users(self, usernames):
+        """ Map usernames to user ids, looking up unknown names once. """
+        missing = usernames - self.user_ids.keys()
+        if missing:
+            users = User.objects.using(self.using).filter(username__in=missing)
+            self.user_ids.update(users.values_list('username', 'id'))
+            missing -= self.user_ids.keys()
+        if missing and self.create_users:
+            for username in missing:
+                user = User(username=username)
+                user.set_unusable_password()
+                user.save(using=self.using)
+                self.user_ids[username] = user.id
+        elif missing:
+            raise CommandError(f"Unknown users: {', '.join(sorted(missing))} (see --create-users).")
+        return self.user_ids
+
+    def _reset_sequences(self):
+        """ Move primary key sequences past the imported ids. """
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(no_style(), [Topic, Entry])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
@@ -0,0 +1,34 @@
+""" Purge deleted topics with their entries. """
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from learning_logs.deletion import purge_topic
+from learning_logs.models import Topic
+
+
+class Command(BaseCommand):
+    help = ("Remove the entries of deleted topics in batches, then the topics. Resumes purges "
+            "interrupted by restarts (or lost with TASKS_BACKEND = 'thread').")
+
+    def add_arguments(self, parser):
+        parser.add_argument('topic_ids', nargs='*', type=int, metavar='topic_id',
+                            help="Deleted topics to purge (default: all).")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Entries removed per transaction (default: TOPIC_PURGE_BATCH_SIZE).")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        topics = Topic.objects.using(using).deleted()
+        if options['topic_ids']:
+            topics = topics.filter(id__in=options['topic_ids'])
+        topic_ids = list(topics.order_by('deleted_at', 'id').values_list('id', flat=True))
+
+        removed = 0
+        for topic_id in topic_ids:
+            def progress(done, remaining):
+                self.stdout.write(f"... topic {topic_id}: {done} entries removed, {remaining} remaining")
+
+            removed += purge_topic(topic_id, options['batch_size'], using=using, progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Purged {len(topic_ids)} topics, {removed} entries."))
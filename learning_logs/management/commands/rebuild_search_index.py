@@ -0,0 +1,41 @@
+""" Rebuild the full-text search index of entries from scratch. """
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from learning_logs.models import Entry
+from learning_logs.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Clear the entry search index and index every entry again in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Entries indexed per transaction.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database alias to rebuild the index of.")
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+        backend = get_backend(using)
+
+        backend.clear()
+        entries = Entry.objects.using(using).only('id', 'text').order_by('id')
+        indexed = 0
+        batch = []
+        for entry in entries.iterator(chunk_size=batch_size):
+            batch.append(entry)
+            if len(batch) == batch_size:
+                indexed += self._index(backend, batch, using)
+                batch = []
+        indexed += self._index(backend, batch, using)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} entries."))
+
+    def _index(self, backend, batch, using):
+        with transaction.atomic(using=using):
+            backend.index(batch)
+        if batch:
+            self.stdout.write(f"... {batch[-1].id}")
+        return len(batch)
@@ -0,0 +1,29 @@
+""" Recompute denormalized entry statistics of topics. """
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from learning_logs.counters import reconcile
+from learning_logs.models import Topic
+
+
+class Command(BaseCommand):
+    help = "Recompute Topic.entry_count and Topic.last_entry_at from entries in id batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Topics updated per transaction.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+        while True:
+            ids = list(Topic.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += reconcile(Topic.objects.filter(id__in=ids))
+            last_id = ids[-1]
+            self.stdout.write(f"... {updated} topics")
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {updated} topics."))
@@ -0,0 +1,45 @@
+""" Fill Entry.text_html of existing entries. """
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from learning_logs.cache import bump_topic_version
+from learning_logs.models import Entry
+from learning_logs.rendering import render_text
+
+
+class Command(BaseCommand):
+    help = ("Render entry text to Entry.text_html in id batches. "
+            "Only entries without HTML are rendered unless --all is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Render every entry again (after changing ENTRY_MARKUP).")
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Entries updated per transaction.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+        entries = Entry.objects.using(using).only('id', 'topic_id', 'text').order_by('id')
+        if not options['all']:
+            entries = entries.filter(text_html='')
+
+        rendered = 0
+        last_id = 0
+        while True:
+            batch = list(entries.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for entry in batch:
+                entry.text_html = render_text(entry.text)
+            with transaction.atomic(using=using):
+                Entry.objects.using(using).bulk_update(batch, ['text_html'])
+            # Cached topic fragments hold the old HTML
+            for topic_id in {entry.topic_id for entry in batch}:
+                bump_topic_version(topic_id)
+            rendered += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"... {rendered} entries")
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} entries."))
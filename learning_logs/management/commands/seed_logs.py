@@ -0,0 +1,158 @@
+""" Generate synthetic users, topics and entries for load testing. """
+
+import datetime
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+
+from learning_logs.bulk import keep_auto_now_add
+from learning_logs.cache import bump_topics_version
+from learning_logs.models import Topic, Entry
+from learning_logs.rendering import render_text
+from learning_logs.search import get_backend
+
+WORDS = (
+    "python django model view template query index cache topic entry note learn read write test "
+    "server client request response database table column row value field form user session page "
+    "list order filter search text string number date time list dict set tuple class function method "
+    "module package import return yield async await thread process memory disk network socket file "
+    "loop branch error exception debug deploy build release version commit merge branch review patch"
+).split()
+
+# Generated dates start here and advance a few seconds per row
+START_DATE = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class Command(BaseCommand):
+    help = ("Deterministically generate users, topics and entries with bulk_create(). "
+            "The same options and --seed always produce the same data.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--topics-per-user', type=float, default=5,
+                            help="Mean topics per user (uniform from 0 to twice the mean).")
+        parser.add_argument('--entries-per-topic', type=float, default=20,
+                            help="Mean entries per topic.")
+        parser.add_argument('--topic-size', choices=['fixed', 'uniform', 'pareto'], default='pareto',
+                            help="Distribution of entries per topic (pareto: few huge topics).")
+        parser.add_argument('--max-entries-per-topic', type=int, default=100_000)
+        parser.add_argument('--public-ratio', type=float, default=0.3)
+        parser.add_argument('--text-words', type=int, nargs=2, default=[5, 200], metavar=('MIN', 'MAX'),
+                            help="Range of words per entry text.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed',
+                            help="Username prefix (users are <prefix><number>).")
+        parser.add_argument('--password', default='seed',
+                            help="Password of every generated user.")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Rows inserted per bulk_create() and transaction.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.using = options['database']
+        self.rng = random.Random(options['seed'])
+        if User.objects.using(self.using).filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Users prefixed {options['prefix']!r} exist already, use another --prefix.")
+
+        # Explicit primary keys: entries need topic ids without a query per topic
+        self.next_ids = {model: (model.objects.using(self.using).aggregate(Max('id'))['id__max'] or 0) + 1
+                         for model in (User, Topic, Entry)}
+        self.pending = {User: [], Topic: [], Entry: []}
+        self.created = {User: 0, Topic: 0, Entry: 0}
+        self.clock = 0
+        self.started = time.perf_counter()
+        password = make_password(options['password'])
+
+        with keep_auto_now_add(Topic, Entry):
+            for number in range(options['users']):
+                user = User(id=self._id(User), username=f"{options['prefix']}{number}",
+                            password=password, date_joined=self._date())
+                self._add(user)
+                for _ in range(self.rng.randint(0, round(2 * options['topics_per_user']))):
+                    self._add_topic(user)
+            self._flush()
+
+        self._reset_sequences()
+        bump_topics_version()
+        elapsed = time.perf_counter() - self.started
+        rows = sum(self.created.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {self.created[User]} users, {self.created[Topic]} topics, "
+            f"{self.created[Entry]} entries in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)."
+        ))
+
+    def _add_topic(self, user):
+        size = self._topic_size()
+        topic_date = self._date()
+        # Evenly spaced entries, so the last date is known before they are made
+        step = datetime.timedelta(seconds=self.rng.randint(1, 3600))
+        topic = Topic(
+            id=self._id(Topic), user_id=user.id, text=self._text(2, 6).capitalize(),
+            date_added=topic_date, public=self.rng.random() < self.options['public_ratio'],
+            entry_count=size, last_entry_at=topic_date + step * size if size else None,
+        )
+        self._add(topic)
+        for number in range(1, size + 1):
+            text = self._text(*self.options['text_words'])
+            entry = Entry(id=self._id(Entry), topic_id=topic.id, text=text, text_html=render_text(text),
+                          date_added=topic_date + step * number)
+            self._add(entry)
+
+    def _topic_size(self):
+        mean = self.options['entries_per_topic']
+        distribution = self.options['topic_size']
+        if distribution == 'fixed':
+            size = mean
+        elif distribution == 'uniform':
+            size = self.rng.uniform(0, 2 * mean)
+        else:
+            # Pareto with alpha 1.5 has mean 3 * minimum
+            size = self.rng.paretovariate(1.5) * mean / 3
+        return min(int(size), self.options['max_entries_per_topic'])
+
+    def _text(self, minimum, maximum):
+        return ' '.join(self.rng.choices(WORDS, k=self.rng.randint(minimum, maximum)))
+
+    def _id(self, model):
+        pk = self.next_ids[model]
+        self.next_ids[model] += 1
+        return pk
+
+    def _date(self):
+        self.clock += self.rng.randint(1, 120)
+        return START_DATE + datetime.timedelta(seconds=self.clock)
+
+    def _add(self, obj):
+        self.pending[type(obj)].append(obj)
+        if len(self.pending[type(obj)]) >= self.options['batch_size']:
+            self._flush()
+
+    def _flush(self):
+        """ Insert pending rows in one transaction (parents first). """
+        with transaction.atomic(using=self.using):
+            for model in (User, Topic, Entry):
+                objs = self.pending[model]
+                model.objects.using(self.using).bulk_create(objs)
+                if model is Entry:
+                    # bulk_create() sends no signals
+                    get_backend(self.using).index(objs)
+                self.created[model] += len(objs)
+                self.pending[model] = []
+        elapsed = time.perf_counter() - self.started
+        rows = sum(self.created.values())
+        self.stdout.write(f"... {rows} rows ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+    def _reset_sequences(self):
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(no_style(), [User, Topic, Entry])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
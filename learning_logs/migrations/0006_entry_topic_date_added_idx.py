@@ -0,0 +1,17 @@
+# Generated by Django 3.2.4 on 2026-10-18 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_logs', '0005_topic_public'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['topic', '-date_added', '-id'], name='entry_topic_date_added_idx'),
+        ),
+    ]
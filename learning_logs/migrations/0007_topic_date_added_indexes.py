@@ -0,0 +1,21 @@
+# Generated by Django 3.2.4 on 2026-10-18 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_logs', '0006_entry_topic_date_added_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['public', 'date_added', 'id'], name='topic_public_date_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['user', 'date_added', 'id'], name='topic_user_date_added_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.4 on 2026-10-18 08:40
+
+from django.conf import settings
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE learning_logs_entry_fts USING fts5(text, tokenize = 'unicode61')",
+    "INSERT INTO learning_logs_entry_fts (rowid, text) SELECT id, text FROM learning_logs_entry",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE learning_logs_entry_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    """CREATE TABLE learning_logs_entry_search (
+        entry_id bigint PRIMARY KEY REFERENCES learning_logs_entry (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )""",
+    "CREATE INDEX learning_logs_entry_search_document ON learning_logs_entry_search USING GIN (document)",
+    # Same configuration as the search backend (search.py)
+    ("""INSERT INTO learning_logs_entry_search (entry_id, document)
+        SELECT id, to_tsvector(%s::regconfig, text) FROM learning_logs_entry""", [settings.SEARCH_CONFIG]),
+]
+POSTGRESQL_BACKWARD = [
+    "DROP TABLE learning_logs_entry_search",
+]
+
+
+def run(statements):
+    """ Run vendor specific statements, other databases fall back to a table scan. """
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            # Statements with parameters are (sql, params) pairs
+            sql, params = statement if isinstance(statement, tuple) else (statement, ())
+            schema_editor.execute(sql, params)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_logs', '0007_topic_date_added_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.4 on 2026-10-18 08:19
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_entries(apps, schema_editor):
+    """ Fill counters of existing topics. """
+    Topic = apps.get_model('learning_logs', 'Topic')
+    Entry = apps.get_model('learning_logs', 'Entry')
+    entries = Entry.objects.filter(topic=OuterRef('pk')).order_by()
+    entry_count = entries.values('topic').annotate(count=Count('*')).values('count')
+    latest = entries.order_by('-date_added').values('date_added')[:1]
+    Topic.objects.update(entry_count=Coalesce(Subquery(entry_count), 0), last_entry_at=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_logs', '0008_entry_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='entry_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='last_entry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(count_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.4 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_logs', '0009_topic_entry_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
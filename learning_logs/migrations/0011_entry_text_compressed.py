@@ -0,0 +1,75 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:05
+
+from django.db import migrations, models, transaction
+
+import learning_logs.compression
+
+# Rows converted per UPDATE batch
+BATCH_SIZE = 500
+
+
+def convert(apps, schema_editor, source, target):
+    """ Copy entry texts between the text columns in batches of ids, each committed. """
+    Entry = apps.get_model('learning_logs', 'Entry')
+    alias = schema_editor.connection.alias
+    entries = Entry.objects.using(alias).only('id', source).order_by('id')
+    last_id = 0
+    while True:
+        with transaction.atomic(using=alias):
+            batch = list(entries.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                break
+            for entry in batch:
+                setattr(entry, target, getattr(entry, source))
+            Entry.objects.using(alias).bulk_update(batch, [target])
+        last_id = batch[-1].id
+
+
+def compress_texts(apps, schema_editor):
+    convert(apps, schema_editor, 'text', 'text_compressed')
+
+
+def decompress_texts(apps, schema_editor):
+    convert(apps, schema_editor, 'text_compressed', 'text')
+
+
+class Migration(migrations.Migration):
+    # Every operation and batch commits on its own: in one transaction the
+    # copy would run under the ACCESS EXCLUSIVE lock taken by AddField on
+    # PostgreSQL, however small the batches. A failed run must be finished
+    # by hand (the columns added so far stay).
+    atomic = False
+
+    dependencies = [
+        ('learning_logs', '0010_entry_text_html'),
+    ]
+
+    operations = [
+        # New binary column next to the text one, filled in batches
+        migrations.AddField(
+            model_name='entry',
+            name='text_compressed',
+            field=learning_logs.compression.CompressedTextField(null=True),
+        ),
+        # Nullable while migrating back (re-added empty, then filled)
+        migrations.AlterField(
+            model_name='entry',
+            name='text',
+            field=models.TextField(null=True),
+        ),
+        migrations.RunPython(compress_texts, decompress_texts),
+        migrations.RemoveField(
+            model_name='entry',
+            name='text',
+        ),
+        migrations.RenameField(
+            model_name='entry',
+            old_name='text_compressed',
+            new_name='text',
+        ),
+        migrations.AlterField(
+            model_name='entry',
+            name='text',
+            field=learning_logs.compression.CompressedTextField(),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.4 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_logs', '0011_entry_text_compressed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 3.2.4 on 2026-10-18 13:10
+
+from django.db import migrations, models, transaction
+
+import learning_logs.compression
+
+# Rows converted per UPDATE batch
+BATCH_SIZE = 500
+
+
+def convert(apps, schema_editor, source, target):
+    """ Copy rendered HTML between the columns in batches of ids, each committed. """
+    Entry = apps.get_model('learning_logs', 'Entry')
+    alias = schema_editor.connection.alias
+    entries = Entry.objects.using(alias).only('id', source).order_by('id')
+    last_id = 0
+    while True:
+        with transaction.atomic(using=alias):
+            batch = list(entries.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                break
+            for entry in batch:
+                setattr(entry, target, getattr(entry, source) or '')
+            Entry.objects.using(alias).bulk_update(batch, [target])
+        last_id = batch[-1].id
+
+
+def compress_html(apps, schema_editor):
+    convert(apps, schema_editor, 'text_html', 'text_html_compressed')
+
+
+def decompress_html(apps, schema_editor):
+    convert(apps, schema_editor, 'text_html_compressed', 'text_html')
+
+
+class Migration(migrations.Migration):
+    # Batches commit on their own, like 0011_entry_text_compressed
+    atomic = False
+
+    dependencies = [
+        ('learning_logs', '0012_topic_deleted_at'),
+    ]
+
+    operations = [
+        # New binary column next to the text one, filled in batches
+        migrations.AddField(
+            model_name='entry',
+            name='text_html_compressed',
+            field=learning_logs.compression.CompressedTextField(blank=True, editable=False, null=True),
+        ),
+        # Nullable while migrating back (re-added empty, then filled)
+        migrations.AlterField(
+            model_name='entry',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(compress_html, decompress_html),
+        migrations.RemoveField(
+            model_name='entry',
+            name='text_html',
+        ),
+        migrations.RenameField(
+            model_name='entry',
+            old_name='text_html_compressed',
+            new_name='text_html',
+        ),
+        migrations.AlterField(
+            model_name='entry',
+            name='text_html',
+            field=learning_logs.compression.CompressedTextField(blank=True, editable=False),
+        ),
+    ]
@@ -1,15 +1,51 @@
 from django.db import models
 from django.contrib.auth.models import User
+
+from .compression import CompressedTextField
 # django -> database -> models
 
 # Create your models here.
 
+class TopicQuerySet(models.QuerySet):
+    def active(self):
+        """ Topics not deleted (deleted topics stay until their entries are purged). """
+        return self.filter(deleted_at=None)
+
+    def deleted(self):
+        """ Deleted topics waiting for the purge. """
+        return self.exclude(deleted_at=None)
+
 class Topic(models.Model):
     # Model attributes
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.CharField(max_length=200)
     date_added = models.DateTimeField(auto_now_add=True)
     public = models.BooleanField(False)
+    # Denormalized entry statistics (maintained by learning_logs.counters)
+    entry_count = models.PositiveIntegerField(default=0)
+    last_entry_at = models.DateTimeField(null=True, blank=True)
+    # Set when deleted, the topic and its entries are purged later (learning_logs.deletion)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = TopicQuerySet.as_manager()
+
+    # public as loaded from the database (signals purge the public topics
+    # list when a topic is made private)
+    _loaded_public = False
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of public and per-user topic lists
+            models.Index(fields=['public', 'date_added', 'id'], name='topic_public_date_added_idx'),
+            models.Index(fields=['user', 'date_added', 'id'], name='topic_user_date_added_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        topic = super().from_db(db, field_names, values)
+        if 'public' in field_names:
+            topic._loaded_public = topic.public
+        return topic
 
     # Model representation
     def __str__(self):
@@ -20,12 +56,29 @@ class Entry(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE)
 
     # Model attributes
-    text = models.TextField()
+    # Stored compressed above settings.ENTRY_COMPRESSION_THRESHOLD bytes
+    text = CompressedTextField()
     date_added = models.DateTimeField(auto_now_add=True)
+    # Text rendered by learning_logs.rendering after save (empty until
+    # rendered), compressed like text
+    text_html = CompressedTextField(blank=True, editable=False)
 
     # Additional model attributes
     class Meta:
         verbose_name_plural = 'entries'
+        indexes = [
+            # Keyset pagination of topic entries (newest first)
+            models.Index(fields=['topic', '-date_added', '-id'], name='entry_topic_date_added_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            # Rendered again by a background task (learning_logs.tasks.render_entries)
+            self.text_html = ''
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'text_html'}
+        super().save(*args, **kwargs)
 
     # Model representation (title)
     def __str__(self):
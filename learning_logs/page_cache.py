@@ -0,0 +1,108 @@
+""" Whole pages cached for anonymous visitors.
+
+Pages that are the same for every anonymous visitor (topics list, public
+topic pages) are tagged by their views with surrogate keys and the
+versions of those keys read before rendering (add_surrogate_keys()).
+AnonymousPageCacheMiddleware stores tagged responses to GET requests
+without session or CSRF cookies and answers the next such request from the
+cache, without touching the database, until one of the keys is purged:
+the keys are the version counters of cache.py, which signals.py bumps on
+every write.
+
+Responses carry a Surrogate-Key header for proxies that purge by key and
+Cache-Control/Vary headers so proxies and browsers keep anonymous pages
+for settings.PAGE_CACHE_MAX_AGE seconds at most (nothing purges them)
+and never keep pages of logged in users.
+"""
+
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from learning_log.middleware import HybridMiddleware
+
+from .cache import surrogate_keys_purged
+
+
+def add_surrogate_keys(response, versions):
+    """ Tag response with {surrogate key: version read before rendering}. """
+    response.surrogate_keys = {**getattr(response, 'surrogate_keys', {}), **versions}
+    response['Surrogate-Key'] = ' '.join(sorted(response.surrogate_keys))
+    return response
+
+
+def _cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def page_cache_key(request):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    # Pages of older releases may come from other templates
+    return f'learning_logs:page:{settings.ETAG_SALT}:{url}'
+
+
+class AnonymousPageCacheMiddleware(HybridMiddleware):
+    """ Serve pages tagged with surrogate keys to anonymous visitors from the cache. """
+
+    def __init__(self, get_response):
+        if not settings.PAGE_CACHE_TIMEOUT:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        anonymous = self._anonymous(request)
+        if anonymous:
+            cached = self._cached_response(request)
+            if cached is not None:
+                return cached
+        response = self.get_response(request)
+        return self._store(request, response, anonymous)
+
+    async def ahandle(self, request):
+        anonymous = self._anonymous(request)
+        # The cache API is blocking, it's used from pool threads
+        if anonymous:
+            cached = await sync_to_async(self._cached_response, thread_sensitive=False)(request)
+            if cached is not None:
+                return cached
+        response = await self.get_response(request)
+        return await sync_to_async(self._store, thread_sensitive=False)(request, response, anonymous)
+
+    def _anonymous(self, request):
+        return (request.method in ('GET', 'HEAD')
+                and settings.SESSION_COOKIE_NAME not in request.COOKIES
+                and settings.CSRF_COOKIE_NAME not in request.COOKIES)
+
+    def _cached_response(self, request):
+        """ Cached page for request (or a 304), None if missing or purged. """
+        cached = _cache().get(page_cache_key(request))
+        if cached is None or surrogate_keys_purged(cached.surrogate_keys):
+            return None
+        try:
+            # Metrics are recorded per URL name
+            request.resolver_match = resolve(request.path_info)
+        except Resolver404:
+            pass
+        return get_conditional_response(request, etag=cached.get('ETag'), response=cached)
+
+    def _store(self, request, response, anonymous):
+        """ Add cache headers to a tagged response and cache it if anonymous. """
+        if getattr(response, 'surrogate_keys', None) is None:
+            return response
+
+        if not anonymous:
+            # Pages of logged in users must not be stored by proxies
+            patch_cache_control(response, private=True)
+        else:
+            patch_cache_control(response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+        # Anonymous and logged in visitors get different pages
+        patch_vary_headers(response, ('Cookie',))
+        if (anonymous and request.method == 'GET' and response.status_code == 200
+                and not response.streaming and not response.cookies):
+            _cache().set(page_cache_key(request), response, settings.PAGE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,207 @@
+""" Keyset (cursor) pagination for ordered querysets.
+
+Pages are selected with a WHERE clause on the ordering key of the last
+(or first) row of the previous page instead of OFFSET, so every page costs
+a single index range scan no matter how deep into the list it is.
+"""
+
+import base64
+import heapq
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+# Cursor directions
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    """ Pagination token can't be decoded or doesn't match the ordering. """
+
+
+def encode_cursor(direction, values):
+    """ Pack direction and ordering key values into an opaque URL-safe token. """
+    # isoformat() keeps microseconds (DjangoJSONEncoder would round them)
+    values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    payload = json.dumps([direction, values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """ Unpack a token made by encode_cursor() into (direction, values). """
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, values = json.loads(payload)
+    except (ValueError, TypeError) as error:
+        raise InvalidCursor(token) from error
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+class KeysetPaginator:
+    """ Split an ordered queryset into pages addressed by cursors.
+
+    `ordering` must be unique for every row (end it with the primary key),
+    e.g. ('-date_added', '-id').
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        # (field name, descending) pairs
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def page(self, cursor=None):
+        """ Return the Page addressed by cursor (first page if cursor is empty). """
+        if not cursor:
+            return Page(self, NEXT, None)
+        direction, values = decode_cursor(cursor)
+        return Page(self, direction, self._to_python(values))
+
+    def _to_python(self, values):
+        """ Convert decoded JSON values back to field values. """
+        if len(values) != len(self.keys):
+            raise InvalidCursor(values)
+        opts = self.queryset.model._meta
+        try:
+            return [opts.get_field(name).to_python(value)
+                    for (name, _), value in zip(self.keys, values)]
+        except ValidationError as error:
+            raise InvalidCursor(values) from error
+
+    def key(self, row):
+        """ Ordering key values of a row (model instance or .values() dict). """
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.keys]
+        return [getattr(row, name) for name, _ in self.keys]
+
+    def fetch(self, direction, values, limit):
+        """ Return up to limit rows after values in the given direction. """
+        return self._fetch(self.queryset, direction, values, limit)
+
+    def _fetch(self, queryset, direction, values, limit):
+        ordering = self.ordering if direction == NEXT else self._reversed_ordering()
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(direction, values))
+        return list(queryset[:limit])
+
+    def _reversed_ordering(self):
+        return [name if descending else f'-{name}' for name, descending in self.keys]
+
+    def _seek(self, direction, values):
+        """ Build `(a, b, ...) > (x, y, ...)` in terms of the page ordering. """
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.keys, values):
+            # Rows after the cursor are smaller for descending fields
+            lookup = 'lt' if descending == (direction == NEXT) else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        # Redundant bound on the leading field turns the seek into an index range
+        (name, descending), value = self.keys[0], values[0]
+        lookup = 'lte' if descending == (direction == NEXT) else 'gte'
+        return Q(**{f'{name}__{lookup}': value}) & condition
+
+
+class MergedKeysetPaginator(KeysetPaginator):
+    """ Keyset paginator over the union of several querysets.
+
+    Every queryset is paged on its own (one index range scan each) and the
+    ordered results are merged in Python, so no OR condition reaches the
+    database. Rows found by more than one queryset are returned once.
+    All ordering fields must share one direction.
+    """
+
+    def __init__(self, querysets, ordering, per_page):
+        super().__init__(querysets[0], ordering, per_page)
+        self.querysets = list(querysets)
+        if len({descending for _, descending in self.keys}) != 1:
+            raise ValueError("Merged ordering fields must share one direction.")
+
+    def fetch(self, direction, values, limit):
+        descending = self.keys[0][1]
+        # Merged streams are sorted in the fetch (not the page) order
+        reverse = descending == (direction == NEXT)
+        streams = [self._fetch(queryset, direction, values, limit) for queryset in self.querysets]
+        rows = []
+        last_key = None
+        for row in heapq.merge(*streams, key=self.key, reverse=reverse):
+            key = self.key(row)
+            if key == last_key:
+                continue
+            rows.append(row)
+            last_key = key
+            if len(rows) == limit:
+                break
+        return rows
+
+
+class Page:
+    """ Lazily fetched page of a KeysetPaginator. """
+
+    def __init__(self, paginator, direction, values):
+        self.paginator = paginator
+        self.direction = direction
+        self.values = values
+        self._object_list = None
+        self._has_more = False
+
+    @property
+    def object_list(self):
+        if self._object_list is None:
+            limit = self.paginator.per_page + 1
+            rows = self.paginator.fetch(self.direction, self.values, limit)
+            # One extra row tells whether there is another page
+            self._has_more = len(rows) == limit
+            rows = rows[:self.paginator.per_page]
+            if self.direction == PREVIOUS:
+                rows.reverse()
+            self._object_list = rows
+        return self._object_list
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        if not self.object_list:
+            return False
+        return self._has_more if self.direction == NEXT else True
+
+    def has_previous(self):
+        if not self.object_list:
+            return False
+        if self.direction == PREVIOUS:
+            return self._has_more
+        return self.values is not None
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return encode_cursor(NEXT, self.paginator.key(self.object_list[-1]))
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return encode_cursor(PREVIOUS, self.paginator.key(self.object_list[0]))
+        return None
+
+
+def get_page_or_404(paginator, cursor):
+    """ Return paginator page for cursor, raise Http404 for a malformed cursor. """
+    try:
+        return paginator.page(cursor)
+    except InvalidCursor:
+        raise Http404
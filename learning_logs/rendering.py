@@ -0,0 +1,45 @@
+""" Rendering of entry text to HTML (stored in Entry.text_html).
+
+Entries are rendered once when they are saved instead of on every page
+view. settings.ENTRY_MARKUP selects the markup:
+
+- 'text': paragraphs and line breaks, like the `linebreaks` template filter
+- 'markdown': Markdown sanitized to a small set of tags (needs the optional
+  `markdown` and `bleach` packages)
+"""
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.html import linebreaks
+
+MARKUPS = ('text', 'markdown')
+
+# Tags and attributes Markdown output is cleaned to
+MARKDOWN_TAGS = [
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'i', 'li', 'ol', 'p', 'pre', 'strong', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+]
+MARKDOWN_ATTRIBUTES = {'a': ['href', 'title'], 'abbr': ['title']}
+MARKDOWN_PROTOCOLS = ['http', 'https', 'mailto']
+
+
+def render_text(text, markup=None):
+    """ Return safe HTML of entry text in the given (default: configured) markup. """
+    markup = markup or settings.ENTRY_MARKUP
+    if markup == 'text':
+        return linebreaks(text, autoescape=True)
+    if markup == 'markdown':
+        return _render_markdown(text)
+    raise ImproperlyConfigured(f"ENTRY_MARKUP must be one of {', '.join(MARKUPS)}, not {markup!r}.")
+
+
+def _render_markdown(text):
+    try:
+        import bleach
+        import markdown
+    except ImportError as error:
+        raise ImproperlyConfigured("ENTRY_MARKUP = 'markdown' requires the markdown and bleach packages.") from error
+    html = markdown.markdown(text, extensions=['tables', 'fenced_code'])
+    # Raw HTML in the text passes through Markdown, strip everything unexpected
+    return bleach.clean(html, tags=MARKDOWN_TAGS, attributes=MARKDOWN_ATTRIBUTES,
+                        protocols=MARKDOWN_PROTOCOLS, strip=True)
@@ -0,0 +1,132 @@
+""" Full-text search over entry texts.
+
+Entries are indexed in a database specific inverted index which is kept
+up to date by signal receivers (see signals.py) and can be rebuilt with
+the `rebuild_search_index` management command:
+
+- SQLite: FTS5 virtual table learning_logs_entry_fts (rowid = entry id)
+- PostgreSQL: learning_logs_entry_search table, tsvector column with GIN index
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .compression import decompressed
+from .models import Entry
+
+
+class SearchBackend:
+    """ Fallback for databases without a full-text index (table scan). """
+
+    # Rows read at once by filter()
+    SCAN_CHUNK_SIZE = 500
+
+    def __init__(self, using):
+        self.using = using
+
+    def index(self, entries):
+        """ Add or replace entries (objects with id and text) in the index. """
+
+    def remove(self, entry_ids):
+        """ Remove entries from the index. """
+
+    def clear(self):
+        """ Remove every entry from the index. """
+
+    def filter(self, queryset, query):
+        """ Narrow Entry queryset to entries matching query.
+
+        Texts are stored compressed (compression.py), so they're matched in
+        Python: the newest settings.SEARCH_FALLBACK_MAX_RESULTS matches at
+        most, scanned SCAN_CHUNK_SIZE rows at a time.
+        """
+        query = query.casefold()
+        rows = queryset.order_by('-date_added', '-id').values_list('id', 'text')
+        matches = []
+        for pk, text in rows.iterator(chunk_size=self.SCAN_CHUNK_SIZE):
+            if query in decompressed(text).casefold():
+                matches.append(pk)
+                if len(matches) >= settings.SEARCH_FALLBACK_MAX_RESULTS:
+                    break
+        return queryset.filter(id__in=matches)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    table = 'learning_logs_entry_fts'
+
+    def index(self, entries):
+        rows = [(entry.id, entry.text) for entry in entries]
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [row[:1] for row in rows])
+            cursor.executemany(f'INSERT INTO {self.table} (rowid, text) VALUES (%s, %s)', rows)
+
+    def remove(self, entry_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in entry_ids])
+
+    def clear(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def filter(self, queryset, query):
+        # Quote every word, so user input can't use FTS5 query syntax
+        words = re.findall(r'\w+', query)
+        fts_query = ' '.join(f'"{word}"' for word in words)
+        if not fts_query:
+            return queryset.none()
+        matches = RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [fts_query])
+        return queryset.filter(id__in=matches)
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    table = 'learning_logs_entry_search'
+
+    def index(self, entries):
+        rows = [(entry.id, settings.SEARCH_CONFIG, entry.text) for entry in entries]
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (entry_id, document) VALUES (%s, to_tsvector(%s::regconfig, %s)) '
+                f'ON CONFLICT (entry_id) DO UPDATE SET document = EXCLUDED.document',
+                rows,
+            )
+
+    def remove(self, entry_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE entry_id = ANY(%s)', [list(entry_ids)])
+
+    def clear(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+
+    def filter(self, queryset, query):
+        matches = RawSQL(
+            f'SELECT entry_id FROM {self.table} WHERE document @@ plainto_tsquery(%s::regconfig, %s)',
+            [settings.SEARCH_CONFIG, query],
+        )
+        return queryset.filter(id__in=matches)
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+def get_backend(using='default'):
+    """ Return search backend for the database alias. """
+    backend_class = BACKENDS.get(connections[using].vendor, SearchBackend)
+    return backend_class(using)
+
+
+def search_entries(query, user):
+    """ Entries matching query in own topics of user and in public topics. """
+    entries = Entry.objects.filter(topic__deleted_at=None)
+    if user.is_authenticated:
+        entries = entries.filter(Q(topic__user=user) | Q(topic__public=True))
+    else:
+        entries = entries.filter(topic__public=True)
+    return get_backend(entries.db).filter(entries, query)
@@ -0,0 +1,73 @@
+""" Signal receivers keeping derived data in sync with topics and entries.
+
+Cache versions are bumped as soon as the write commits, so the next page
+shows the write (they also purge the pages cached for anonymous visitors,
+page_cache.py). Not before: a request reading in between would cache the
+old rows under the new version, kept until the next write.
+Everything else is enqueued as background tasks (tasks.py), so a request
+writing an entry only waits for the row write.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Topic, Entry
+from .cache import bump_topic_version, bump_topics_version, bump_public_topics_version
+from . import tasks
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def invalidate_topic(sender, instance, using, **kwargs):
+    """ Topic changed: drop its cached fragments, mark topics list changed. """
+    topic_id = instance.id
+    # Private topics aren't on the public list unless they just stopped being public
+    public_list = instance.public or instance._loaded_public
+    instance._loaded_public = instance.public
+
+    def bump():
+        bump_topic_version(topic_id)
+        bump_topics_version()
+        if public_list:
+            bump_public_topics_version()
+    transaction.on_commit(bump, using=using)
+
+
+@receiver(post_save, sender=Entry)
+@receiver(post_delete, sender=Entry)
+def invalidate_entry_topic(sender, instance, using, **kwargs):
+    """ Entry changed: drop cached fragments of its topic. """
+    topic_id = instance.topic_id
+    transaction.on_commit(lambda: bump_topic_version(topic_id), using=using)
+
+
+@receiver(post_save, sender=Entry)
+def render_entry(sender, instance, using, **kwargs):
+    """ Entry created or edited: render its text (shown unrendered until then). """
+    tasks.render_entries.enqueue([instance.id], using=using)
+
+
+@receiver(post_save, sender=Entry)
+def index_entry(sender, instance, using, **kwargs):
+    """ Entry created or edited: (re)index its text. """
+    tasks.index_entries.enqueue([instance.id], using=using)
+
+
+@receiver(post_delete, sender=Entry)
+def unindex_entry(sender, instance, using, **kwargs):
+    """ Entry deleted: remove it from the search index. """
+    tasks.unindex_entries.enqueue([instance.id], using=using)
+
+
+@receiver(post_save, sender=Entry)
+def count_entry(sender, instance, created, using, **kwargs):
+    """ Entry created: update entry statistics of its topic. """
+    if created:
+        tasks.count_entries.enqueue(instance.topic_id, 1, instance.date_added.isoformat(), using=using)
+
+
+@receiver(post_delete, sender=Entry)
+def uncount_entry(sender, instance, using, **kwargs):
+    """ Entry deleted: update entry statistics of its topic. """
+    tasks.uncount_entries.enqueue(instance.topic_id, 1, using=using)
@@ -0,0 +1,81 @@
+""" Background tasks keeping derived entry data up to date (enqueued by signals.py).
+
+Every task reads the current rows, so running one twice or after a later
+change of the same rows is harmless, except the counter tasks: their F()
+increments (counters.py) cost the same for any topic size, and a retry
+after the UPDATE committed (the cache bump failed) counts twice until
+`manage.py reconcile_topic_counters` repairs it.
+"""
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.dateparse import parse_datetime
+
+from tasks.registry import task
+
+from . import counters, deletion
+from .cache import bump_topic_version, bump_topics_version, bump_public_topics_version
+from .models import Topic, Entry
+from .rendering import render_text
+from .search import get_backend
+
+
+@task
+def index_entries(entry_ids, using=DEFAULT_DB_ALIAS):
+    """ (Re)index texts of entries, drop deleted ones from the index. """
+    entries = list(Entry.objects.using(using).only('id', 'text').filter(id__in=entry_ids))
+    backend = get_backend(using)
+    backend.index(entries)
+    backend.remove(set(entry_ids) - {entry.id for entry in entries})
+
+
+@task
+def unindex_entries(entry_ids, using=DEFAULT_DB_ALIAS):
+    """ Remove entries from the search index. """
+    get_backend(using).remove(entry_ids)
+
+
+def _topic_counters_changed(topic_id, using):
+    # Topics list shows the entry statistics
+    bump_topics_version()
+    if Topic.objects.using(using).filter(id=topic_id, public=True).exists():
+        bump_public_topics_version()
+
+
+@task
+def count_entries(topic_id, count, last_added_at, using=DEFAULT_DB_ALIAS):
+    """ Add count entries (the newest added at last_added_at, ISO 8601) to a topic's statistics. """
+    counters.entries_added(topic_id, count, parse_datetime(last_added_at), using=using)
+    _topic_counters_changed(topic_id, using)
+
+
+@task
+def uncount_entries(topic_id, count, using=DEFAULT_DB_ALIAS):
+    """ Remove count deleted entries from a topic's statistics. """
+    counters.entries_removed(topic_id, count, using=using)
+    _topic_counters_changed(topic_id, using)
+
+
+@task
+def refresh_topic_counters(topic_id, using=DEFAULT_DB_ALIAS):
+    """ Recompute entry statistics of a topic (queued by older releases). """
+    counters.reconcile(Topic.objects.using(using).filter(id=topic_id))
+    _topic_counters_changed(topic_id, using)
+
+
+@task
+def render_entries(entry_ids, using=DEFAULT_DB_ALIAS):
+    """ Render texts of entries to Entry.text_html. """
+    entries = list(Entry.objects.using(using).only('id', 'topic_id', 'text').filter(id__in=entry_ids))
+    for entry in entries:
+        entry.text_html = render_text(entry.text)
+    # Not save(), which would clear the HTML and enqueue this task again
+    Entry.objects.using(using).bulk_update(entries, ['text_html'])
+    # Cached fragments were rendered without the HTML
+    for topic_id in {entry.topic_id for entry in entries}:
+        bump_topic_version(topic_id)
+
+
+@task
+def purge_topic(topic_id, using=DEFAULT_DB_ALIAS):
+    """ Remove a deleted topic with its entries (resumes an interrupted purge). """
+    deletion.purge_topic(topic_id, using=using)
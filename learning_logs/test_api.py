@@ -0,0 +1,80 @@
+from django.test import TestCase, Client, override_settings
+from django.shortcuts import reverse
+from django.contrib.auth.models import User
+
+from .models import Topic, Entry
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        user2 = User.objects.create_user(
+            username="test2", email="test2@email.com", password="test2"
+        )
+        self.public = Topic.objects.create(user=user2, text="Public", public=True)
+        self.mine = Topic.objects.create(user=user, text="Mine", public=False)
+        self.hidden = Topic.objects.create(user=user2, text="Hidden", public=False)
+        # Run the counter tasks enqueued on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            for topic in (self.public, self.mine, self.hidden):
+                for number in range(3):
+                    Entry.objects.create(topic=topic, text=f"{topic.text} {number}")
+
+    def _login(self):
+        self.assertTrue(self.client.login(username="test", password="test"))
+
+    def test_topics_projection(self):
+        response = self.client.get(reverse("learning_logs:api_topics"), {"fields": "id,text"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [{"id": self.public.id, "text": "Public"}])
+
+        self._login()
+        response = self.client.get(reverse("learning_logs:api_topics"), {"fields": "text,entry_count"})
+        self.assertEqual(
+            response.json()["results"],
+            [{"text": "Public", "entry_count": 3}, {"text": "Mine", "entry_count": 3}],
+        )
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse("learning_logs:api_topics"), {"fields": "password"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json()["error"])
+
+    @override_settings(ENTRIES_PER_PAGE=2)
+    def test_topic_entries_pagination(self):
+        url = reverse("learning_logs:api_topic_entries", kwargs={"topic_id": self.public.id})
+        data = self.client.get(url, {"fields": "text"}).json()
+        self.assertEqual(data["results"], [{"text": "Public 2"}, {"text": "Public 1"}])
+        data = self.client.get(url, {"fields": "text", "cursor": data["next"]}).json()
+        self.assertEqual(data["results"], [{"text": "Public 0"}])
+        self.assertIsNone(data["next"])
+
+    def test_topic_entries_visibility(self):
+        url = reverse("learning_logs:api_topic_entries", kwargs={"topic_id": self.mine.id})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self._login()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_batch_single_query(self):
+        self._login()
+        topic_ids = f"{self.public.id},{self.mine.id},{self.hidden.id}"
+        url = reverse("learning_logs:api_entries_batch")
+        params = {"topics": topic_ids, "limit": 2, "fields": "text,date_added"}
+        # Caches the session and the user
+        self.client.get(url, params)
+        # Only the entries query
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        results = response.json()["results"]
+        self.assertEqual(set(results), {str(self.public.id), str(self.mine.id)})
+        self.assertEqual([entry["text"] for entry in results[str(self.mine.id)]], ["Mine 2", "Mine 1"])
+        self.assertEqual(set(results[str(self.mine.id)][0]), {"text", "date_added"})
+
+    def test_batch_invalid(self):
+        url = reverse("learning_logs:api_entries_batch")
+        self.assertEqual(self.client.get(url, {"topics": "x"}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {"topics": "1", "limit": 0}).status_code, 400)
@@ -0,0 +1,165 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from .deletion import purge_topic
+from .models import Topic, Entry
+from .search import search_entries
+
+
+class ExportImportTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        topic1 = Topic.objects.create(user=user, text="Test1", public=True)
+        topic2 = Topic.objects.create(user=user, text="Test2", public=False)
+        Entry.objects.create(topic=topic1, text="Test entry 1")
+        Entry.objects.create(topic=topic1, text="Test entry 2 ✓")
+        Entry.objects.create(topic=topic2, text="Test entry 3\nsecond line")
+
+        handle, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def _snapshot(self):
+        topics = list(Topic.objects.order_by("id").values_list("id", "user__username", "text", "date_added", "public"))
+        entries = list(Entry.objects.order_by("id").values_list("id", "topic_id", "text", "date_added"))
+        return topics, entries
+
+    def test_round_trip(self):
+        before = self._snapshot()
+        call_command("export_logs", output=self.path, stderr=StringIO())
+        Topic.objects.all().delete()
+
+        # Entries of a topic in separate batches
+        call_command("import_logs", self.path, batch_size=1, stdout=StringIO())
+        self.assertEqual(self._snapshot(), before)
+        # Derived data is rebuilt for imported rows
+        topic = Topic.objects.get(text="Test1")
+        self.assertEqual(topic.entry_count, 2)
+        self.assertEqual(topic.last_entry_at, topic.entry_set.latest("date_added").date_added)
+        user = User.objects.get(username="test")
+        self.assertEqual(search_entries("second", user).count(), 1)
+
+    def test_unknown_user(self):
+        call_command("export_logs", output=self.path, stderr=StringIO())
+        Topic.objects.all().delete()
+        User.objects.all().delete()
+
+        with self.assertRaises(CommandError):
+            call_command("import_logs", self.path, stdout=StringIO())
+
+        call_command("import_logs", self.path, create_users=True, stdout=StringIO())
+        self.assertEqual(Topic.objects.count(), 2)
+        self.assertFalse(User.objects.get(username="test").has_usable_password())
+
+
+class SeedLogsTests(TestCase):
+    def _seed(self, **options):
+        call_command("seed_logs", users=5, topics_per_user=2, entries_per_topic=4,
+                     batch_size=7, stdout=StringIO(), **options)
+
+    def _snapshot(self):
+        return (list(Topic.objects.order_by("id").values_list("user__username", "text", "date_added", "public")),
+                list(Entry.objects.order_by("id").values_list("topic__text", "text", "date_added")))
+
+    def test_deterministic(self):
+        self._seed(seed=1)
+        first = self._snapshot()
+        Topic.objects.all().delete()
+        User.objects.all().delete()
+
+        self._seed(seed=1)
+        self.assertEqual(self._snapshot(), first)
+        self.assertTrue(self.client.login(username="seed0", password="seed"))
+
+    def test_counters(self):
+        self._seed()
+        for topic in Topic.objects.all():
+            entries = topic.entry_set.order_by("-date_added")
+            self.assertEqual(topic.entry_count, entries.count())
+            self.assertEqual(topic.last_entry_at, entries[0].date_added if entries else None)
+
+    def test_existing_prefix(self):
+        self._seed()
+        with self.assertRaises(CommandError):
+            self._seed()
+
+
+class BenchViewsTests(TestCase):
+    def test_report(self):
+        call_command("seed_logs", users=1, topics_per_user=1, topic_size="fixed", stdout=StringIO())
+        output = StringIO()
+        call_command("bench_views", requests=2, stdout=output, stderr=StringIO())
+        report = json.loads(output.getvalue())
+        view = report["views"]["learning_logs:topic"]
+        self.assertEqual(view["authenticated"]["status"], [200])
+        self.assertGreater(view["authenticated"]["queries"], 0)
+
+
+class CompressionReportTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        topic = Topic.objects.create(user=user, text="Test1", public=True)
+        self.entry = Entry.objects.create(topic=topic, text="Long entry text. " * 100)
+        Entry.objects.create(topic=topic, text="Short entry. " * 5)
+
+    def test_report(self):
+        out = StringIO()
+        call_command("compression_report", stdout=out)
+        self.assertIn("Entries: 2 (1 compressed, 0 with compressed HTML)", out.getvalue())
+
+    def test_html_reported(self):
+        Entry.objects.filter(id=self.entry.id).update(text_html="<p>Long entry text.</p>" * 100)
+        out = StringIO()
+        call_command("compression_report", stdout=out)
+        self.assertIn("Entries: 2 (1 compressed, 1 with compressed HTML)", out.getvalue())
+        self.assertIn("HTML: 0.0MiB, stored: 0.0MiB (2%)", out.getvalue())
+
+    def test_recompress(self):
+        with self.settings(ENTRY_COMPRESSION_THRESHOLD=10):
+            out = StringIO()
+            call_command("compression_report", recompress=True, stdout=out)
+            self.assertIn("Stored 1 entries again", out.getvalue())
+            out = StringIO()
+            call_command("compression_report", stdout=out)
+            self.assertIn("Entries: 2 (2 compressed, 0 with compressed HTML)", out.getvalue())
+        self.assertEqual(Entry.objects.get(id=self.entry.id).text, "Long entry text. " * 100)
+
+
+class PurgeTopicsTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+        self.kept = Topic.objects.create(user=user, text="Test2", public=True)
+        for number in range(5):
+            Entry.objects.create(topic=self.topic, text=f"Entry {number}")
+        Entry.objects.create(topic=self.kept, text="Kept entry")
+        Topic.objects.filter(id=self.topic.id).update(deleted_at=timezone.now())
+
+    def test_resumes_interrupted_purge(self):
+        def interrupt(removed, remaining):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            purge_topic(self.topic.id, batch_size=2, progress=interrupt)
+        self.assertEqual(Entry.objects.filter(topic=self.topic).count(), 3)
+
+        out = StringIO()
+        call_command("purge_topics", batch_size=2, stdout=out)
+        self.assertIn("2 entries removed, 1 remaining", out.getvalue())
+        self.assertIn("Purged 1 topics, 3 entries.", out.getvalue())
+        self.assertEqual(list(Topic.objects.values_list("id", flat=True)), [self.kept.id])
+        self.assertEqual(Entry.objects.get().text, "Kept entry")
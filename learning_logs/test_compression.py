@@ -0,0 +1,71 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from .compression import PLAIN, ZLIB, CompressedText, compress, decompress, decompressed
+from .exports import entry_record
+from .models import Topic, Entry
+
+LONG_TEXT = "A long note about Python generators.\n" * 100
+
+
+class CompressTests(TestCase):
+    def test_round_trip(self):
+        data = compress(LONG_TEXT, "zlib", threshold=0)
+        self.assertEqual(data[:1], ZLIB)
+        self.assertLess(len(data), len(LONG_TEXT))
+        self.assertEqual(decompress(data), LONG_TEXT)
+
+    def test_short_text_plain(self):
+        data = compress("Short ✓", "zlib", threshold=1024)
+        self.assertEqual(data, PLAIN + "Short ✓".encode())
+        self.assertEqual(decompress(data), "Short ✓")
+
+    def test_incompressible_text_plain(self):
+        # zlib header and checksum outweigh what a single character saves
+        self.assertEqual(compress("x", "zlib", threshold=0), PLAIN + b"x")
+
+    def test_unknown_method(self):
+        with self.assertRaises(ImproperlyConfigured):
+            compress(LONG_TEXT, "lzma", threshold=0)
+
+
+@override_settings(ENTRY_COMPRESSION="zlib", ENTRY_COMPRESSION_THRESHOLD=1024)
+class CompressedTextFieldTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+        self.entry = Entry.objects.create(topic=self.topic, text=LONG_TEXT)
+
+    def _stored(self, entry):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT text FROM learning_logs_entry WHERE id = %s", [entry.id])
+            return bytes(cursor.fetchone()[0])
+
+    def test_stored_compressed(self):
+        stored = self._stored(self.entry)
+        self.assertEqual(stored[:1], ZLIB)
+        self.assertLess(len(stored), len(LONG_TEXT))
+        self.assertEqual(self._stored(Entry.objects.create(topic=self.topic, text="Short")), PLAIN + b"Short")
+
+    def test_decompressed_on_access(self):
+        entry = Entry.objects.get(id=self.entry.id)
+        self.assertIsInstance(entry.__dict__["text"], CompressedText)
+        self.assertEqual(entry.text, LONG_TEXT)
+        # Kept decompressed
+        self.assertEqual(entry.__dict__["text"], LONG_TEXT)
+
+    def test_edit(self):
+        entry = Entry.objects.get(id=self.entry.id)
+        entry.text = LONG_TEXT + "Edited."
+        entry.save()
+        self.assertEqual(Entry.objects.get(id=self.entry.id).text, LONG_TEXT + "Edited.")
+
+    def test_values(self):
+        value = Entry.objects.values_list("text", flat=True).get(id=self.entry.id)
+        self.assertEqual(decompressed(value), LONG_TEXT)
+        row = Entry.objects.values("id", "topic_id", "text", "date_added").get(id=self.entry.id)
+        self.assertEqual(entry_record(row)["text"], LONG_TEXT)
@@ -1,9 +1,29 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.contrib.auth.models import AnonymousUser
+from asgiref.sync import async_to_sync
+import asyncio
 from django.shortcuts import reverse
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.utils import timezone
+from io import StringIO
+from unittest import mock
+import csv
+import json
+import tempfile
+
+from tasks.backends import DatabaseBackend
+from tasks.models import QueuedTask
 
 from .models import Topic, Entry
+from . import async_views, bulk, deletion
+from .cache import surrogate_key_version, topic_version
+from .page_cache import AnonymousPageCacheMiddleware, add_surrogate_keys
+from .search import SearchBackend
 
 
 class TopicListTests(TestCase):
@@ -33,6 +53,45 @@ class TopicListTests(TestCase):
         self.assertEqual(len(response.context["topics"]), 4)
 
 
+@override_settings(TOPICS_PER_PAGE=2)
+class TopicListPaginationTests(TestCase):
+    def setUp(self):
+        self.url = reverse("learning_logs:topics")
+        self.client = Client()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        user2 = User.objects.create_user(
+            username="test2", email="test2@email.com", password="test2"
+        )
+        Topic.objects.create(user=user, text="Mine public", public=True)
+        Topic.objects.create(user=user2, text="Other public", public=True)
+        Topic.objects.create(user=user, text="Mine private", public=False)
+        Topic.objects.create(user=user2, text="Other private", public=False)
+        Topic.objects.create(user=user2, text="Other public 2", public=True)
+
+    def _walk(self):
+        """ Follow next links and collect topic names. """
+        names = []
+        response = self.client.get(self.url)
+        while True:
+            names += [topic.text for topic in response.context["topics"]]
+            cursor = response.context["topics"].next_cursor
+            if cursor is None:
+                return names
+            response = self.client.get(self.url, {"cursor": cursor})
+
+    def test_unauthenticated(self):
+        self.assertEqual(self._walk(), ["Mine public", "Other public", "Other public 2"])
+
+    def test_authenticated_merges_own_and_public(self):
+        self.assertTrue(self.client.login(username="test", password="test"))
+        self.assertEqual(
+            self._walk(),
+            ["Mine public", "Other public", "Mine private", "Other public 2"],
+        )
+
+
 class TopicRetrieveTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -86,6 +145,444 @@ class TopicRetrieveTests(TestCase):
         self.assertEqual(len(response.context["entries"]), 3)
 
 
+@override_settings(ENTRIES_PER_PAGE=2)
+class TopicPaginationTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+        for number in range(5):
+            Entry.objects.create(topic=self.topic, text=f"Test entry {number}")
+        # Same timestamp for every entry, id has to break the ties
+        Entry.objects.update(date_added=self.topic.date_added)
+        self.url = reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id})
+
+    def _texts(self, response):
+        return [entry.text for entry in response.context["entries"]]
+
+    def test_walk_forward_and_back(self):
+        response = self.client.get(self.url)
+        self.assertEqual(self._texts(response), ["Test entry 4", "Test entry 3"])
+        self.assertFalse(response.context["entries"].has_previous())
+
+        cursor = response.context["entries"].next_cursor
+        response = self.client.get(self.url, {"cursor": cursor})
+        self.assertEqual(self._texts(response), ["Test entry 2", "Test entry 1"])
+
+        cursor = response.context["entries"].next_cursor
+        response = self.client.get(self.url, {"cursor": cursor})
+        self.assertEqual(self._texts(response), ["Test entry 0"])
+        self.assertFalse(response.context["entries"].has_next())
+
+        cursor = response.context["entries"].previous_cursor
+        response = self.client.get(self.url, {"cursor": cursor})
+        self.assertEqual(self._texts(response), ["Test entry 2", "Test entry 1"])
+
+        cursor = response.context["entries"].previous_cursor
+        response = self.client.get(self.url, {"cursor": cursor})
+        self.assertEqual(self._texts(response), ["Test entry 4", "Test entry 3"])
+        self.assertFalse(response.context["entries"].has_previous())
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class TopicCacheTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        # Cache versions are bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+            self.entry = Entry.objects.create(topic=self.topic, text="Test entry 1")
+        self.url = reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id})
+
+    def _entry_queries(self):
+        """ Get topic page, return queries selecting entries. """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [query["sql"] for query in queries if "learning_logs_entry" in query["sql"]]
+
+    def test_cached_page_skips_entries_query(self):
+        self.assertEqual(len(self._entry_queries()), 1)
+        self.assertEqual(self._entry_queries(), [])
+
+    def test_new_entry_invalidates(self):
+        self._entry_queries()
+        self.assertTrue(self.client.login(username="test", password="test"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("learning_logs:new_entry", kwargs={"topic_id": self.topic.id}),
+                {"text": "Fresh entry"},
+            )
+        self.assertContains(self.client.get(self.url), "Fresh entry")
+
+    def test_edit_entry_invalidates(self):
+        self._entry_queries()
+        self.assertTrue(self.client.login(username="test", password="test"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("learning_logs:edit_entry", kwargs={"entry_id": self.entry.id}),
+                {"text": "Edited entry"},
+            )
+        response = self.client.get(self.url)
+        self.assertContains(response, "Edited entry")
+        self.assertNotContains(response, "Test entry 1")
+
+    def test_bulk_entries_bump_after_commit(self):
+        version = topic_version(self.topic.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            bulk.create_entries(self.topic, ["Bulk entry"])
+            # A read before the commit can't cache old entries under the new version
+            self.assertEqual(topic_version(self.topic.id), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(topic_version(self.topic.id), version)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        user2 = User.objects.create_user(
+            username="test2", email="test2@email.com", password="test2"
+        )
+        public = Topic.objects.create(user=user2, text="Public", public=True)
+        private = Topic.objects.create(user=user, text="Mine", public=False)
+        hidden = Topic.objects.create(user=user2, text="Hidden", public=False)
+        # Run the indexing tasks enqueued on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.public_entry = Entry.objects.create(topic=public, text="Python generators")
+            Entry.objects.create(topic=private, text="Python decorators")
+            Entry.objects.create(topic=hidden, text="Python metaclasses")
+        self.url = reverse("learning_logs:search")
+
+    def _search(self, query):
+        response = self.client.get(self.url, {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return sorted(entry.text for entry in response.context["entries"])
+
+    def test_unauthenticated_sees_public(self):
+        self.assertEqual(self._search("python"), ["Python generators"])
+
+    def test_authenticated_sees_own_and_public(self):
+        self.assertTrue(self.client.login(username="test", password="test"))
+        self.assertEqual(self._search("python"), ["Python decorators", "Python generators"])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self._search('generators" OR "*'), [])
+        self.assertEqual(self._search("!!"), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.public_entry.text = "Rust iterators"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.public_entry.save()
+        self.assertEqual(self._search("generators"), [])
+        self.assertEqual(self._search("iterators"), ["Rust iterators"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.public_entry.delete()
+        self.assertEqual(self._search("iterators"), [])
+
+    @override_settings(SEARCH_FALLBACK_MAX_RESULTS=1)
+    def test_fallback_keeps_newest_matches(self):
+        entries = Entry.objects.filter(topic__public=False)
+        matches = SearchBackend("default").filter(entries, "PYTHON")
+        self.assertEqual([entry.text for entry in matches], ["Python metaclasses"])
+
+
+class TopicCountersTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.topic = Topic.objects.create(user=self.user, text="Test1", public=True)
+
+    def _topic(self):
+        return Topic.objects.get(pk=self.topic.pk)
+
+    def test_new_entry_counts(self):
+        self.assertTrue(self.client.login(username="test", password="test"))
+        url = reverse("learning_logs:new_entry", kwargs={"topic_id": self.topic.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {"text": "Entry 1"})
+            self.client.post(url, {"text": "Entry 2"})
+        topic = self._topic()
+        self.assertEqual(topic.entry_count, 2)
+        self.assertEqual(topic.last_entry_at, Entry.objects.latest("date_added").date_added)
+
+        response = self.client.get(reverse("learning_logs:topics"))
+        self.assertContains(response, "2 entries")
+
+    def test_delete_entry_uncounts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Entry.objects.create(topic=self.topic, text="Entry 1")
+            last = Entry.objects.create(topic=self.topic, text="Entry 2")
+            last.delete()
+        topic = self._topic()
+        self.assertEqual(topic.entry_count, 1)
+        self.assertEqual(topic.last_entry_at, first.date_added)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        topic = self._topic()
+        self.assertEqual(topic.entry_count, 0)
+        self.assertIsNone(topic.last_entry_at)
+
+    def test_counted_incrementally(self):
+        # Drifted counters are incremented, not recomputed from the entries
+        Topic.objects.update(entry_count=41)
+        with self.captureOnCommitCallbacks(execute=True):
+            Entry.objects.create(topic=self.topic, text="Entry 1")
+        self.assertEqual(self._topic().entry_count, 42)
+
+    def test_reconcile_command(self):
+        entry = Entry.objects.create(topic=self.topic, text="Entry 1")
+        Topic.objects.update(entry_count=42, last_entry_at=None)
+        call_command("reconcile_topic_counters", stdout=StringIO())
+        topic = self._topic()
+        self.assertEqual(topic.entry_count, 1)
+        self.assertEqual(topic.last_entry_at, entry.date_added)
+
+
+class EntryRenderingTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+        self.url = reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id})
+
+    def test_new_and_edited_entry_are_rendered(self):
+        self.assertTrue(self.client.login(username="test", password="test"))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post(
+                reverse("learning_logs:new_entry", kwargs={"topic_id": self.topic.id}),
+                {"text": "<b>one</b>\ntwo"},
+            )
+            # Rendered by a task after the commit, the page falls back to the filter
+            self.assertEqual(Entry.objects.get().text_html, "")
+            self.assertContains(self.client.get(self.url), "<p>&lt;b&gt;one&lt;/b&gt;<br>two</p>", html=False)
+        self.assertTrue(callbacks)
+        entry = Entry.objects.get()
+        self.assertEqual(entry.text_html, "<p>&lt;b&gt;one&lt;/b&gt;<br>two</p>")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("learning_logs:edit_entry", kwargs={"entry_id": entry.id}),
+                {"text": "three\n\nfour"},
+            )
+        entry.refresh_from_db()
+        self.assertEqual(entry.text_html, "<p>three</p>\n\n<p>four</p>")
+        self.assertContains(self.client.get(self.url), "<p>three</p>", html=False)
+
+    def test_page_emits_stored_html(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = Entry.objects.create(topic=self.topic, text="plain")
+        Entry.objects.filter(pk=entry.pk).update(text_html="<p>stored</p>")
+        response = self.client.get(self.url)
+        self.assertContains(response, "<p>stored</p>", html=False)
+        self.assertNotContains(response, "plain")
+
+    def test_render_entries_command(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = Entry.objects.create(topic=self.topic, text="old entry")
+        Entry.objects.update(text_html="")
+        self.assertContains(self.client.get(self.url), "<p>old entry</p>", html=False)
+
+        call_command("render_entries", stdout=StringIO())
+        entry.refresh_from_db()
+        self.assertEqual(entry.text_html, "<p>old entry</p>")
+        # Topic fragment is rendered again
+        Entry.objects.update(text="changed")
+        call_command("render_entries", all=True, stdout=StringIO())
+        self.assertContains(self.client.get(self.url), "<p>changed</p>", html=False)
+
+
+class TopicExportTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+        self.private = Topic.objects.create(user=user, text="Test2", public=False)
+        Entry.objects.create(topic=self.topic, text="First, entry")
+        Entry.objects.create(topic=self.topic, text="Second\nentry")
+
+    def _download(self, topic, fmt):
+        url = reverse("learning_logs:export_topic", kwargs={"topic_id": topic.id, "fmt": fmt})
+        return self.client.get(url)
+
+    def test_markdown(self):
+        response = self._download(self.topic, "md")
+        self.assertEqual(response.status_code, 200)
+        content = b"".join(response.streaming_content).decode()
+        self.assertTrue(content.startswith("# Test1\n"))
+        self.assertLess(content.index("First, entry"), content.index("Second\nentry"))
+
+    def test_jsonl(self):
+        response = self._download(self.topic, "jsonl")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["text"] for line in lines], ["First, entry", "Second\nentry"])
+
+    def test_csv(self):
+        response = self._download(self.topic, "csv")
+        rows = list(csv.reader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([row[2] for row in rows], ["text", "First, entry", "Second\nentry"])
+        self.assertIn('filename="topic-', response["Content-Disposition"])
+
+    def test_access(self):
+        self.assertEqual(self._download(self.private, "md").status_code, 404)
+        self.assertEqual(self._download(self.topic, "pdf").status_code, 404)
+        self.assertTrue(self.client.login(username="test", password="test"))
+        self.assertEqual(self._download(self.private, "md").status_code, 200)
+
+
+class AsgiTopicExportTests(TransactionTestCase):
+    """ Downloads through the ASGI application, which sends responses from the event loop. """
+
+    def setUp(self):
+        user = User.objects.create_user(username="test", password="test")
+        self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+        Entry.objects.create(topic=self.topic, text="First, entry")
+        Entry.objects.create(topic=self.topic, text="Second\nentry " * 100)
+
+    def _get(self, path):
+        """ Status and body of a GET request sent to learning_log.asgi.application. """
+        from learning_log.asgi import application
+
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "root_path": "", "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+        }
+        async_to_sync(application)(scope, receive, send)
+        body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+        return messages[0]["status"], body.decode()
+
+    @override_settings(EXPORT_SPOOL_MAX_SIZE=100)
+    def test_markdown(self):
+        url = reverse("learning_logs:export_topic", kwargs={"topic_id": self.topic.id, "fmt": "md"})
+        status, content = self._get(url)
+        self.assertEqual(status, 200)
+        self.assertTrue(content.startswith("# Test1\n"))
+        self.assertIn("Second\nentry " * 100, content)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        # Cache versions are bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+            self.private = Topic.objects.create(user=user, text="Test2", public=False)
+            Entry.objects.create(topic=self.topic, text="Test entry 1")
+        self.url = reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id})
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_unchanged_topic_costs_one_query(self):
+        # Anonymous pages from the page cache cost none (PageCacheTests)
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_no_last_modified(self):
+        # Whole seconds, a write in the same second would get a stale 304
+        response = self.client.get(self.url)
+        self.assertNotIn("Last-Modified", response)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_entry_changes_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Entry.objects.create(topic=self.topic, text="Test entry 2")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Test entry 2")
+
+    def test_etag_differs_per_user(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertTrue(self.client.login(username="test", password="test"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_private_topic_is_not_revalidated(self):
+        self.assertTrue(self.client.login(username="test", password="test"))
+        url = reverse("learning_logs:topic", kwargs={"topic_id": self.private.id})
+        etag = self.client.get(url)["ETag"]
+        self.client.logout()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_topics_list(self):
+        url = reverse("learning_logs:topics")
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Topic.objects.create(user=self.topic.user, text="Test3", public=True)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+# Test transaction is only visible from the test thread
+@override_settings(ASYNC_DB_THREAD_SENSITIVE=True)
+class AsyncViewsTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        # Cache versions are bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic = Topic.objects.create(user=user, text="Test1", public=True)
+            self.private = Topic.objects.create(user=user, text="Test2", public=False)
+            Entry.objects.create(topic=self.topic, text="Test entry 1")
+
+    def _get(self, view, *args):
+        request = self.factory.get("/")
+        request.user = AnonymousUser()
+        return async_to_sync(view)(request, *args)
+
+    def test_index(self):
+        self.assertEqual(self._get(async_views.index).status_code, 200)
+
+    def test_topics(self):
+        response = self._get(async_views.topics)
+        self.assertContains(response, "Test1")
+        self.assertNotContains(response, "Test2")
+
+    def test_topic(self):
+        self.assertContains(self._get(async_views.topic, self.topic.id), "Test entry 1")
+        with self.assertRaises(Http404):
+            self._get(async_views.topic, self.private.id)
+
+
 class TopicCreateTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -267,3 +764,234 @@ class EntryEditTests(TestCase):
         response = self.client.post(url, {"text": "New entry text"})
         self.assertEqual(response.status_code, 404)
         self.assertNotIn("New entry text", self.entry_other.text)
+
+
+class DeleteTopicTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        User.objects.create_user(
+            username="test2", email="test2@email.com", password="test2"
+        )
+        self.topic = Topic.objects.create(user=self.user, text="Doomed", public=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(3):
+                Entry.objects.create(topic=self.topic, text=f"Doomed entry {number}")
+        self.url = reverse("learning_logs:delete_topic", kwargs={"topic_id": self.topic.id})
+
+    def test_hidden_at_once_then_purged(self):
+        self.assertTrue(self.client.login(username="test", password="test"))
+        self.assertContains(self.client.get(self.url), "Delete the")
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(self.url)
+            self.assertRedirects(response, reverse("learning_logs:topics"))
+            # Marked deleted only, the purge runs after the commit
+            self.assertEqual(Entry.objects.filter(topic=self.topic).count(), 3)
+            self.assertNotContains(self.client.get(reverse("learning_logs:topics")), "Doomed")
+            topic_url = reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id})
+            self.assertEqual(self.client.get(topic_url).status_code, 404)
+            new_entry_url = reverse("learning_logs:new_entry", kwargs={"topic_id": self.topic.id})
+            self.assertEqual(self.client.get(new_entry_url).status_code, 404)
+            response = self.client.get(reverse("learning_logs:search"), {"q": "doomed"})
+            self.assertEqual(list(response.context["entries"]), [])
+            response = self.client.get(reverse("learning_logs:api_topics"))
+            self.assertEqual(response.json()["results"], [])
+        self.assertTrue(callbacks)
+        self.assertFalse(Topic.objects.filter(id=self.topic.id).exists())
+        self.assertFalse(Entry.objects.exists())
+
+    def test_other_user(self):
+        self.assertTrue(self.client.login(username="test2", password="test2"))
+        self.assertEqual(self.client.post(self.url).status_code, 404)
+        self.assertFalse(Topic.objects.get(id=self.topic.id).deleted_at)
+
+
+@override_settings(TASKS_BACKEND="database", TOPIC_PURGE_BATCH_SIZE=2)
+class DatabaseWorkerPurgeTests(TransactionTestCase):
+    def test_batches_committed(self):
+        user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        topic = Topic.objects.create(user=user, text="Doomed", public=True)
+        bulk.create_entries(topic, [f"Doomed entry {number}" for number in range(3)])
+        QueuedTask.objects.all().delete()
+        deletion.delete_topic(topic)
+
+        removed = []
+
+        def interrupted(ids):
+            if removed:
+                raise RuntimeError("Interrupted")
+            removed.extend(ids)
+
+        with mock.patch("learning_logs.deletion.get_backend") as get_backend:
+            get_backend.return_value.remove.side_effect = interrupted
+            with self.assertLogs("tasks.backends", "WARNING"):
+                self.assertTrue(DatabaseBackend().run_next())
+        # The first batch stays purged, not rolled back with the failed run
+        self.assertEqual(Entry.objects.filter(topic=topic).count(), 1)
+
+        QueuedTask.objects.update(run_at=timezone.now())
+        self.assertTrue(DatabaseBackend().run_next())
+        self.assertFalse(Topic.objects.filter(id=topic.id).exists())
+        self.assertFalse(Entry.objects.exists())
+
+
+class NewEntriesTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        User.objects.create_user(
+            username="test2", email="test2@email.com", password="test2"
+        )
+        self.topic = Topic.objects.create(user=self.user, text="Test1", public=True)
+        self.url = reverse("learning_logs:new_entries", kwargs={"topic_id": self.topic.id})
+        self.assertTrue(self.client.login(username="test", password="test"))
+
+    def _post_json(self, entries):
+        return self.client.post(self.url, json.dumps({"entries": entries}), content_type="application/json")
+
+    def test_formset(self):
+        self.assertContains(self.client.get(self.url), 'name="form-4-text"')
+        data = {"form-TOTAL_FORMS": 5, "form-INITIAL_FORMS": 0}
+        data.update({"form-0-text": "first\nline", "form-1-text": "second", "form-3-text": "python"})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, data)
+        self.assertRedirects(response, reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id}))
+        self.assertEqual(
+            list(Entry.objects.order_by("id").values_list("text", "text_html")),
+            [("first\nline", "<p>first<br>line</p>"), ("second", "<p>second</p>"), ("python", "<p>python</p>")],
+        )
+        # Derived data of signals.py is updated too
+        self.assertEqual(Topic.objects.get(id=self.topic.id).entry_count, 3)
+        response = self.client.get(reverse("learning_logs:search"), {"q": "python"})
+        self.assertEqual([entry.text for entry in response.context["entries"]], ["python"])
+
+    def test_empty_formset(self):
+        response = self.client.post(self.url, {"form-TOTAL_FORMS": 5, "form-INITIAL_FORMS": 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Entry.objects.exists())
+
+    def test_json(self):
+        response = self._post_json([{"text": "one"}, {"text": "two"}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["ids"], list(Entry.objects.order_by("id").values_list("id", flat=True)))
+
+    def test_json_all_or_nothing(self):
+        response = self._post_json([{"text": "one"}, {"text": ""}, "three"])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.json()["errors"]), ["1", "2"])
+        self.assertEqual(self._post_json([]).status_code, 400)
+        self.assertEqual(self.client.post(self.url, "{", content_type="application/json").status_code, 400)
+        self.assertFalse(Entry.objects.exists())
+
+    def test_queries_dont_grow_with_entries(self):
+        self._post_json([{"text": "warm up"}])
+        with CaptureQueriesContext(connection) as few:
+            self._post_json([{"text": f"entry {number}"} for number in range(2)])
+        with CaptureQueriesContext(connection) as many:
+            self._post_json([{"text": f"entry {number}"} for number in range(50)])
+        self.assertEqual(len(many), len(few))
+
+    def test_other_user(self):
+        self.assertTrue(self.client.login(username="test2", password="test2"))
+        self.assertEqual(self._post_json([{"text": "one"}]).status_code, 404)
+        self.assertFalse(Entry.objects.exists())
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=3600)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.topic = Topic.objects.create(user=self.user, text="Test1", public=True)
+        self.private = Topic.objects.create(user=self.user, text="Test2", public=False)
+        self.url = reverse("learning_logs:topic", kwargs={"topic_id": self.topic.id})
+        self.topics_url = reverse("learning_logs:topics")
+
+    def test_anonymous_page_cached(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["Surrogate-Key"], f"topic-{self.topic.id}")
+        self.assertEqual(response["Cache-Control"], "public, max-age=0")
+        self.assertIn("Cookie", response["Vary"])
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.content, response.content)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_entry_purges_its_topic(self):
+        self.client.get(self.url)
+        self.client.get(self.topics_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Entry.objects.create(topic=self.topic, text="Test entry 1")
+        self.assertContains(self.client.get(self.url), "Test entry 1")
+        # Entry count of the topics list, updated by a task
+        self.assertContains(self.client.get(self.topics_url), "1 entry")
+
+    def test_private_topic_keeps_public_list(self):
+        self.client.get(self.topics_url)
+        self.private.text = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.private.save()
+        with self.assertNumQueries(0):
+            self.client.get(self.topics_url)
+
+        self.private.public = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.private.save()
+        self.assertContains(self.client.get(self.topics_url), "Renamed")
+        # Loaded again, as when made private by a form
+        topic = Topic.objects.get(id=self.private.id)
+        topic.public = False
+        with self.captureOnCommitCallbacks(execute=True):
+            topic.save()
+        self.assertNotContains(self.client.get(self.topics_url), "Renamed")
+
+    def test_cookies_bypass_cache(self):
+        self.client.get(self.url)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = "token"
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertTrue(queries)
+
+        self.assertTrue(self.client.login(username="test", password="test"))
+        response = self.client.get(self.url)
+        self.assertEqual(response["Cache-Control"], "private")
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_purge_reaches_other_processes(self):
+        # Two cache instances sharing their storage, like the caches of two worker processes
+        with tempfile.TemporaryDirectory() as location:
+            backend = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location}
+            caches = {**settings.CACHES, "worker1": backend, "worker2": backend}
+            worker1 = {"TOPIC_CACHE_ALIAS": "worker1", "PAGE_CACHE_ALIAS": "worker1"}
+            worker2 = {"TOPIC_CACHE_ALIAS": "worker2", "PAGE_CACHE_ALIAS": "worker2"}
+            with override_settings(CACHES=caches):
+                with override_settings(**worker1):
+                    self.client.get(self.url)
+                with override_settings(**worker2), self.captureOnCommitCallbacks(execute=True):
+                    Entry.objects.create(topic=self.topic, text="Test entry 1")
+                with override_settings(**worker1):
+                    self.assertContains(self.client.get(self.url), "Test entry 1")
+
+    def test_async_handler(self):
+        calls = []
+
+        async def get_response(request):
+            calls.append(request)
+            return add_surrogate_keys(HttpResponse("page"), {"topic-0": surrogate_key_version("topic-0")})
+
+        middleware = AnonymousPageCacheMiddleware(get_response)
+        # Awaited by Django's ASGI handler instead of run in its shared thread
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        for _ in range(2):
+            response = async_to_sync(middleware)(RequestFactory().get("/async-page/"))
+        self.assertEqual(response.content, b"page")
+        self.assertEqual(len(calls), 1)
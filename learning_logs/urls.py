@@ -1,23 +1,39 @@
 """ Define URL schemas for learning_logs Django application. """
 
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, api, async_views
 
 app_name = 'learning_logs'
 
+# Read views run on the event loop when served by ASGI (learning_log/asgi.py)
+read_views = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     # Home page (view's index() function)
-    path('', views.index, name='index'),
+    path('', read_views.index, name='index'),
     # All topics
-    path('topics/', views.topics, name='topics'),
+    path('topics/', read_views.topics, name='topics'),
     # Specific topic page
-    path('topics/<int:topic_id>/', views.topic, name='topic'),
+    path('topics/<int:topic_id>/', read_views.topic, name='topic'),
+    # Download topic with entries (md, jsonl or csv)
+    path('topics/<int:topic_id>/export/<str:fmt>/', read_views.export_topic, name='export_topic'),
     # Add new topic
     path('new_topic/', views.new_topic, name='new_topic'),
+    # Delete topic (with confirmation)
+    path('delete_topic/<int:topic_id>/', views.delete_topic, name='delete_topic'),
     # Add new entry
     path('new_entry/<int:topic_id>/', views.new_entry, name='new_entry'),
+    # Add many entries (formset or JSON)
+    path('new_entries/<int:topic_id>/', views.new_entries, name='new_entries'),
     # Edit entry
     path('edit_entry/<int:entry_id>/', views.edit_entry, name='edit_entry'),
+    # Search entries
+    path('search/', views.search, name='search'),
+    # JSON API (read-only)
+    path('api/topics/', api.topics, name='api_topics'),
+    path('api/topics/<int:topic_id>/entries/', api.topic_entries, name='api_topic_entries'),
+    path('api/entries/batch/', api.entries_batch, name='api_entries_batch'),
 ]
 
 # Forms:
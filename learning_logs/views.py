@@ -1,9 +1,19 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import Http404
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.views.decorators.http import condition
 from .models import Topic, Entry
-from .forms import TopicForm, EntryForm
+from .forms import TopicForm, EntryForm, EntryFormSet
+from .pagination import KeysetPaginator, MergedKeysetPaginator, get_page_or_404
+from .cache import topic_version, topics_version, public_topics_version
+from .page_cache import add_surrogate_keys
+from .search import search_entries
+from .exports import ENTRY_FIELDS, FORMATS, spool
+from . import bulk, deletion
 
 # Create your views here.
 
@@ -12,36 +22,117 @@ def index(request):
     # Responds to the request with the web page template
     return render(request, 'learning_logs/index.html')
 
+def _user_tag(request):
+    """ Part of ETag telling users apart (pages differ per user). """
+    return f'u{request.user.id}' if request.user.is_authenticated else 'anon'
+
+def topics_etag(request):
+    """ ETag of the topics list: list version + requesting user. """
+    return f'{settings.ETAG_SALT}-topics-{topics_version()}-{_user_tag(request)}'
+
+# No Last-Modified: versions change several times a second, a client sending
+# only If-Modified-Since (whole seconds) would miss writes of the same second
+@condition(etag_func=topics_etag)
 def topics(request):
     """ Queries data from Topic object/database and puts them into list template. """
-    # All created Topic objects (from database)
+    # Public topics (plus own topics of authenticated user) ordered by date_added
+    # (`public IN (1)` rather than `WHERE public` lets SQLite use the index)
+    public_topics = Topic.objects.active().filter(public__in=[True])
+    ordering = ('date_added', 'id')
+    # Read before the topics, a change while rendering purges the cached page
+    versions = {'topics-public': public_topics_version()}
     if request.user.is_authenticated:
-        topics = Topic.objects.filter(Q(user=request.user) | Q(public=True)).order_by('date_added')
+        # Both lists are paged separately and merged (no OR over the whole table)
+        user_topics = Topic.objects.active().filter(user=request.user)
+        paginator = MergedKeysetPaginator([user_topics, public_topics], ordering, settings.TOPICS_PER_PAGE)
     else:
-        topics = list(Topic.objects.filter(public=True).order_by('date_added'))
+        paginator = KeysetPaginator(public_topics, ordering, settings.TOPICS_PER_PAGE)
+    topics = get_page_or_404(paginator, request.GET.get('cursor'))
 
     # Data format for template
     context = {'topics': topics}
     # Put data into template and sent template back
-    return render(request, 'learning_logs/topics.html', context)
+    response = render(request, 'learning_logs/topics.html', context)
+    # Same for every anonymous visitor, cached by page_cache
+    return add_surrogate_keys(response, versions)
 
-def check_user(user, user2):
-    if user != user2:
+def check_user(topic, user):
+    """ 404 unless user owns topic (ids compared, the owner isn't loaded). """
+    if topic.user_id != user.id:
         raise Http404
 
+def _topic_version_if_visible(request, topic_id):
+    """ Topic version if the user may read the topic, None otherwise (one small query). """
+    # Computed once per request for both validators
+    if not hasattr(request, '_topic_version'):
+        request._topic_version = None
+        topic = Topic.objects.active().filter(id=topic_id).values('user_id', 'public').first()
+        if topic is not None and (topic['public'] or topic['user_id'] == request.user.id):
+            request._topic_version = topic_version(topic_id)
+    return request._topic_version
+
+def topic_etag(request, topic_id):
+    """ ETag of a topic page: topic version + requesting user (None skips 304 so the view can 404). """
+    version = _topic_version_if_visible(request, topic_id)
+    if version is None:
+        return None
+    return f'{settings.ETAG_SALT}-topic-{topic_id}-{version}-{_user_tag(request)}'
+
+@condition(etag_func=topic_etag)
 def topic(request, topic_id):
     """ Queries and returns a specified topic web page by topic_id. """
+    # Read before the topic, a change while rendering purges the cached page
+    version = topic_version(topic_id)
     # Get the specified Topic object (db query)
-    topic = get_object_or_404(Topic, id=topic_id)
+    topic = get_object_or_404(Topic.objects.active(), id=topic_id)
 
     if not topic.public:
-        check_user(topic.user, request.user)
+        check_user(topic, request.user)
 
-    # Order by date_added (descending) (db query)
-    entries = topic.entry_set.order_by('-date_added')
+    # Page of entries ordered by date_added (descending), id breaks ties
+    # (lazy, db query only runs when the cached fragment is missing)
+    cursor = request.GET.get('cursor', '')
+    paginator = KeysetPaginator(topic.entry_set.all(), ('-date_added', '-id'), settings.ENTRIES_PER_PAGE)
+    entries = get_page_or_404(paginator, cursor)
     # Data to put into the template
-    context = {'topic': topic, 'entries': entries}
-    return render(request, 'learning_logs/topic.html', context)
+    context = {
+        'topic': topic,
+        'entries': entries,
+        'cursor': cursor,
+        'cache_version': version,
+        'cache_timeout': settings.TOPIC_CACHE_TIMEOUT,
+    }
+    response = render(request, 'learning_logs/topic.html', context)
+    if topic.public:
+        # Same for every anonymous visitor, cached by page_cache
+        add_surrogate_keys(response, {f'topic-{topic.id}': version})
+    return response
+
+def export_topic(request, topic_id, fmt):
+    """ Streams a topic with all its entries as a Markdown, JSON lines or CSV download (spooled under ASGI). """
+    if fmt not in FORMATS:
+        raise Http404
+    topic = get_object_or_404(Topic.objects.active(), id=topic_id)
+
+    if not topic.public:
+        check_user(topic, request.user)
+
+    # Entries are read in chunks (server-side cursor on PostgreSQL) while the
+    # response is being sent, so memory doesn't grow with the topic size
+    # (it does with the size of single entries, see exports.py)
+    entries = topic.entry_set.order_by('date_added', 'id').values(*ENTRY_FIELDS)
+    entries = entries.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    generator, content_type, extension = FORMATS[fmt]
+    if isinstance(request, ASGIRequest):
+        # Django 3.2 sends streamed responses from the event loop, where the
+        # queries can't run: write the download in this thread first, to a
+        # temporary file beyond EXPORT_SPOOL_MAX_SIZE bytes
+        download = spool(generator(topic, entries), settings.EXPORT_SPOOL_MAX_SIZE)
+        response = FileResponse(download, content_type=content_type)
+    else:
+        response = StreamingHttpResponse(generator(topic, entries), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="topic-{topic.id}.{extension}"'
+    return response
 
 @login_required
 def new_topic(request):
@@ -66,10 +157,22 @@ def new_topic(request):
     else:
         raise Exception("Web page doesn't support other HTTP request methods.")
 
+@login_required
+def delete_topic(request, topic_id):
+    """ Asks for confirmation, then deletes the topic (entries are purged in the background). """
+    topic = get_object_or_404(Topic.objects.active(), id=topic_id)
+    check_user(topic, request.user)
+
+    if request.method == 'POST':
+        # Hidden right away, large topics take a while to purge
+        deletion.delete_topic(topic)
+        return redirect('learning_logs:topics')
+    return render(request, 'learning_logs/delete_topic.html', {'topic': topic})
+
 @login_required
 def new_entry(http_request, topic_id):
-    topic = get_object_or_404(Topic, id=topic_id)
-    check_user(topic.user, http_request.user)
+    topic = get_object_or_404(Topic.objects.active(), id=topic_id)
+    check_user(topic, http_request.user)
 
     if http_request.method == 'GET':
         form = EntryForm()
@@ -91,16 +194,54 @@ def new_entry(http_request, topic_id):
     else:
         raise Exception("Web page doesn't support other HTTP request methods.")
 
+@login_required
+def new_entries(http_request, topic_id):
+    """ Adds many entries at once from a formset or a JSON body ({"entries": [{"text": ...}, ...]}). """
+    topic = get_object_or_404(Topic.objects.active(), id=topic_id)
+    # One ownership check for all entries
+    check_user(topic, http_request.user)
+
+    if http_request.method == 'POST' and http_request.content_type == 'application/json':
+        return _new_entries_json(http_request, topic)
+    if http_request.method == 'GET':
+        formset = EntryFormSet()
+    elif http_request.method == 'POST':
+        formset = EntryFormSet(data=http_request.POST)
+        if formset.is_valid():
+            # Extra forms left empty have no data
+            texts = [form.cleaned_data['text'] for form in formset if form.has_changed()]
+            bulk.create_entries(topic, texts)
+            return redirect('learning_logs:topic', topic_id=topic_id)
+    else:
+        raise Exception("Web page doesn't support other HTTP request methods.")
+    template_render_context = {'formset': formset, 'topic': topic}
+    return render(http_request, 'learning_logs/new_entries.html', template_render_context)
+
+def _new_entries_json(http_request, topic):
+    """ JSON variant of new_entries: nothing is added unless every entry is valid. """
+    try:
+        items = json.loads(http_request.body)['entries']
+    except (ValueError, KeyError, TypeError):
+        items = None
+    if not isinstance(items, list) or not 1 <= len(items) <= settings.BULK_ENTRIES_MAX:
+        return JsonResponse({'error': f'Send {{"entries": [{{"text": ...}}, ...]}} with 1 to '
+                                      f'{settings.BULK_ENTRIES_MAX} entries.'}, status=400)
+    forms = [EntryForm(data=item if isinstance(item, dict) else {}) for item in items]
+    errors = {index: form.errors.get_json_data() for index, form in enumerate(forms) if not form.is_valid()}
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+    entries = bulk.create_entries(topic, [form.cleaned_data['text'] for form in forms])
+    return JsonResponse({'ids': [entry.id for entry in entries]}, status=201)
+
 @login_required
 def edit_entry(http_request, entry_id):
     """ Edits entry with the id entry_id created previously, access via topics/. """
-    # Get topic from all possible entries
-    entry = get_object_or_404(Entry, id=entry_id)
+    # Get topic from all possible entries (of topics not deleted), with its
+    # parent topic in the same query
+    entry = get_object_or_404(Entry.objects.select_related('topic'), id=entry_id, topic__deleted_at=None)
     # Entry parent
     topic = entry.topic
-
-    if topic.user != http_request.user:
-        raise Http404
+    check_user(topic, http_request.user)
 
     if http_request.method == 'GET':
         form = EntryForm(instance=entry)
@@ -118,3 +259,16 @@ def edit_entry(http_request, entry_id):
             return render(http_request, 'learning_logs/edit_entry.html', template_render_context)
     else:
         raise Exception("Web page doesn't support other HTTP request methods.")
+
+def search(request):
+    """ Full-text search over entries of own and public topics. """
+    query = request.GET.get('q', '').strip()
+    entries = None
+    if query:
+        # Newest matching entries first, with the columns of their topics the page shows
+        results = search_entries(query, request.user).select_related('topic').only(
+            'text', 'date_added', 'topic', 'topic__text')
+        paginator = KeysetPaginator(results, ('-date_added', '-id'), settings.ENTRIES_PER_PAGE)
+        entries = get_page_or_404(paginator, request.GET.get('cursor'))
+    context = {'query': query, 'entries': entries}
+    return render(request, 'learning_logs/search.html', context)
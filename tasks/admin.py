@@ -0,0 +1,6 @@
+from django.contrib import admin
+from .models import QueuedTask
+
+# Register your models here.
+
+admin.site.register(QueuedTask)
@@ -0,0 +1,152 @@
+""" Where enqueued tasks run (settings.TASKS_BACKEND).
+
+- 'immediate': in the committing thread right after the commit, failed
+  runs retried at once (development and tests)
+- 'thread': in a pool of settings.TASKS_THREADS threads of the web
+  process, so requests don't wait for them. Tasks still queued or waiting
+  for a retry are lost when the process exits.
+- 'database': stored in the tasks_queuedtask table and run by
+  `python manage.py run_worker` processes, which survives restarts. A
+  task that was running when its worker died runs again once its lease
+  (settings.TASKS_LEASE) ends.
+"""
+
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import QueuedTask
+from .registry import get_task, retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+def run(name, args, kwargs):
+    get_task(name)(*args, **kwargs)
+
+
+class ImmediateBackend:
+    """ Run tasks as soon as they are enqueued. """
+
+    def enqueue(self, name, args, kwargs):
+        for attempt in range(1, settings.TASKS_MAX_ATTEMPTS + 1):
+            try:
+                run(name, args, kwargs)
+                return
+            except Exception:
+                # The write is committed already, don't fail the request
+                logger.exception("Task %s failed (attempt %d of %d)", name, attempt, settings.TASKS_MAX_ATTEMPTS)
+
+
+class ThreadBackend:
+    """ Run tasks in a thread pool of this process. """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        # Started on first use, so preloading gunicorn masters don't fork threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(settings.TASKS_THREADS, thread_name_prefix='tasks')
+            return self._executor
+
+    def enqueue(self, name, args, kwargs, attempts=0):
+        self.executor().submit(self._run, name, args, kwargs, attempts)
+
+    def _run(self, name, args, kwargs, attempts):
+        # Pool threads keep their connections like request threads do
+        close_old_connections()
+        try:
+            run(name, args, kwargs)
+        except Exception:
+            attempts += 1
+            if attempts >= settings.TASKS_MAX_ATTEMPTS:
+                logger.exception("Task %s failed %d times, giving up", name, attempts)
+                return
+            delay = retry_delay(attempts)
+            logger.warning("Task %s failed, retrying in %ss", name, delay, exc_info=True)
+            timer = threading.Timer(delay, self.enqueue, (name, args, kwargs, attempts))
+            timer.daemon = True
+            timer.start()
+        finally:
+            close_old_connections()
+
+
+class DatabaseBackend:
+    """ Queue tasks in the database for run_worker. """
+
+    def enqueue(self, name, args, kwargs):
+        QueuedTask.objects.create(name=name, args=args, kwargs=kwargs, run_at=timezone.now())
+
+    def run_next(self):
+        """ Run the next due task, return False if no task is due. """
+        queued = self._claim()
+        if queued is None:
+            return False
+        # Outside the claiming transaction: the task's writes commit as it
+        # makes them (before its cache bumps), its transactions stay short
+        try:
+            run(queued.name, queued.args, queued.kwargs)
+        except Exception:
+            self._failed(queued)
+        else:
+            queued.delete()
+        return True
+
+    def _claim(self):
+        """ Lease the next due task to this worker for settings.TASKS_LEASE seconds. """
+        with transaction.atomic():
+            # Workers skip tasks other workers are claiming (PostgreSQL)
+            queued = (QueuedTask.objects.select_for_update(skip_locked=True)
+                      .filter(failed_at=None, run_at__lte=timezone.now())
+                      .order_by('run_at', 'id').first())
+            if queued is not None:
+                # Not due for other workers until the lease ends, which only
+                # matters if this worker dies running it
+                queued.run_at = timezone.now() + timedelta(seconds=settings.TASKS_LEASE)
+                queued.save(update_fields=['run_at'])
+        return queued
+
+    def _failed(self, queued):
+        queued.attempts += 1
+        queued.last_error = traceback.format_exc()
+        if queued.attempts >= settings.TASKS_MAX_ATTEMPTS:
+            queued.failed_at = timezone.now()
+            logger.error("Task %s failed %d times, giving up\n%s", queued.name, queued.attempts, queued.last_error)
+        else:
+            delay = retry_delay(queued.attempts)
+            queued.run_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning("Task %s failed, retrying in %ss\n%s", queued.name, delay, queued.last_error)
+        queued.save(update_fields=['attempts', 'last_error', 'failed_at', 'run_at'])
+
+
+BACKENDS = {
+    'immediate': ImmediateBackend,
+    'thread': ThreadBackend,
+    'database': DatabaseBackend,
+}
+
+# One instance per backend name (thread pools are per process)
+_backends = {}
+
+
+def get_backend():
+    """ Return the configured task backend. """
+    name = settings.TASKS_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        try:
+            backend_class = BACKENDS[name]
+        except KeyError:
+            raise ImproperlyConfigured(f"TASKS_BACKEND must be one of {', '.join(BACKENDS)}, not {name!r}.")
+        backend = _backends.setdefault(name, backend_class())
+    return backend
@@ -0,0 +1,42 @@
+""" Run tasks queued in the database (TASKS_BACKEND = 'database'). """
+
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks.backends import DatabaseBackend
+
+
+class Command(BaseCommand):
+    help = ("Run due tasks of the database queue until stopped (SIGTERM or SIGINT finish the running "
+            "task first). Several workers may run at once on PostgreSQL.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Exit when no task is due instead of waiting for more.")
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help="Seconds to wait when no task is due.")
+
+    def handle(self, *args, **options):
+        backend = DatabaseBackend()
+        self.stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self._stop)
+            signal.signal(signal.SIGINT, self._stop)
+
+        ran = 0
+        while not self.stopping:
+            # Reconnect after database restarts like requests do
+            close_old_connections()
+            if backend.run_next():
+                ran += 1
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} tasks."))
+
+    def _stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class QueuedTask(models.Model):
+    """ Task waiting in the database queue (tasks.backends.DatabaseBackend). """
+
+    # Registered task name and JSON arguments
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    # Failed runs so far, the next one isn't before run_at
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True)
+    # Set once all attempts failed (kept for inspection, never run again)
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Due tasks in order
+            models.Index(fields=['failed_at', 'run_at'], name='queuedtask_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} (attempt {self.attempts + 1})"
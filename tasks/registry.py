@@ -0,0 +1,75 @@
+""" Background tasks: post-write work taken off the request path.
+
+A task is a function registered with the @task decorator in an app's
+tasks module (imported at startup). Calling Task.enqueue() schedules it
+to run after the current transaction commits (right away outside
+transactions), so tasks see the rows written with them and nothing runs
+for rolled back writes:
+
+    @task
+    def index_entries(entry_ids, using='default'):
+        ...
+
+    index_entries.enqueue([entry.id])
+
+Arguments must be JSON serializable (pass ids, not model instances).
+Failed runs are retried settings.TASKS_MAX_ATTEMPTS times in total,
+settings.TASKS_RETRY_DELAY seconds after the first failure and twice as
+long after every further one, so tasks must be idempotent.
+settings.TASKS_BACKEND selects where tasks run (see backends.py).
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+logger = logging.getLogger(__name__)
+
+# Task name -> Task
+registry = {}
+
+
+class Task:
+    """ Registered task function. """
+
+    def __init__(self, function):
+        self.function = function
+        self.name = f'{function.__module__}.{function.__qualname__}'
+        self.__doc__ = function.__doc__
+
+    def __call__(self, *args, **kwargs):
+        """ Run the task inline. """
+        return self.function(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task: {self.name}>'
+
+    def enqueue(self, *args, **kwargs):
+        """ Run the task in the background once the current transaction commits. """
+        from .backends import get_backend
+
+        backend = get_backend()
+        # Tasks given a database alias wait for that database's transaction
+        using = kwargs.get('using', DEFAULT_DB_ALIAS)
+        transaction.on_commit(lambda: backend.enqueue(self.name, list(args), kwargs), using=using)
+
+
+def task(function):
+    """ Register function as a background task. """
+    registered = Task(function)
+    registry[registered.name] = registered
+    return registered
+
+
+def get_task(name):
+    """ Return the registered task called name. """
+    try:
+        return registry[name]
+    except KeyError:
+        raise LookupError(f"Unknown task {name!r}, is its app's tasks module imported?")
+
+
+def retry_delay(attempts):
+    """ Seconds to wait before the next run of a task that failed attempts times. """
+    return settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1)
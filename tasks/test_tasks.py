@@ -0,0 +1,146 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .backends import DatabaseBackend, ThreadBackend
+from .models import QueuedTask
+from .registry import get_task, task
+
+calls = []
+# Remaining failures of flaky_task
+failures = []
+
+
+@task
+def record_task(value):
+    calls.append(value)
+
+
+@task
+def atomic_task():
+    calls.append(connection.in_atomic_block)
+
+
+@task
+def flaky_task(value):
+    if failures:
+        failures.pop()
+        raise RuntimeError("Flaky")
+    calls.append(value)
+
+
+class TaskTestMixin:
+    def setUp(self):
+        calls.clear()
+        failures.clear()
+
+
+class RegistryTests(TaskTestMixin, TestCase):
+    def test_registered_by_name(self):
+        self.assertIs(get_task("tasks.test_tasks.record_task"), record_task)
+        with self.assertRaises(LookupError):
+            get_task("tasks.test_tasks.missing")
+
+    def test_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_task.enqueue(1)
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [1])
+
+    def test_immediate_retries(self):
+        failures.extend([True, True])
+        with self.assertLogs("tasks.backends", "ERROR") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                flaky_task.enqueue("done")
+        self.assertEqual(calls, ["done"])
+        self.assertEqual(len(logs.output), 2)
+
+
+@override_settings(TASKS_BACKEND="database", TASKS_MAX_ATTEMPTS=2, TASKS_RETRY_DELAY=60)
+class DatabaseBackendTests(TaskTestMixin, TestCase):
+    def _enqueue(self, task, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            task.enqueue(*args)
+        return QueuedTask.objects.get()
+
+    def test_queued_and_run(self):
+        queued = self._enqueue(record_task, "value")
+        self.assertEqual((queued.name, queued.args), ("tasks.test_tasks.record_task", ["value"]))
+        self.assertEqual(calls, [])
+        self.assertTrue(DatabaseBackend().run_next())
+        self.assertEqual(calls, ["value"])
+        self.assertFalse(QueuedTask.objects.exists())
+        self.assertFalse(DatabaseBackend().run_next())
+
+    def test_retry_with_backoff(self):
+        failures.extend([True, True])
+        self._enqueue(flaky_task, "value")
+        with self.assertLogs("tasks.backends", "WARNING"):
+            DatabaseBackend().run_next()
+        queued = QueuedTask.objects.get()
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn("RuntimeError: Flaky", queued.last_error)
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=50))
+        # Not due yet
+        self.assertFalse(DatabaseBackend().run_next())
+
+        QueuedTask.objects.update(run_at=timezone.now())
+        with self.assertLogs("tasks.backends", "ERROR"):
+            DatabaseBackend().run_next()
+        self.assertIsNotNone(QueuedTask.objects.get().failed_at)
+        self.assertFalse(DatabaseBackend().run_next())
+        self.assertEqual(calls, [])
+
+
+@override_settings(TASKS_BACKEND="database")
+class RunWorkerTests(TaskTestMixin, TransactionTestCase):
+    def test_once(self):
+        # Enqueued right away outside transactions
+        record_task.enqueue(1)
+        record_task.enqueue(2)
+        out = StringIO()
+        call_command("run_worker", once=True, stdout=out)
+        self.assertEqual(calls, [1, 2])
+        self.assertIn("Ran 2 tasks.", out.getvalue())
+
+    def test_runs_outside_claiming_transaction(self):
+        # Writes of the task commit before its cache bumps
+        atomic_task.enqueue()
+        self.assertTrue(DatabaseBackend().run_next())
+        self.assertEqual(calls, [False])
+
+    @override_settings(TASKS_LEASE=60)
+    def test_leased_while_running(self):
+        @task
+        def running_task():
+            queued = QueuedTask.objects.get()
+            calls.append(queued.run_at > timezone.now() + timedelta(seconds=50))
+            # Not run by other workers meanwhile
+            calls.append(DatabaseBackend().run_next())
+
+        running_task.enqueue()
+        self.assertTrue(DatabaseBackend().run_next())
+        self.assertEqual(calls, [True, False])
+        self.assertFalse(QueuedTask.objects.exists())
+
+
+@override_settings(TASKS_RETRY_DELAY=0.01)
+class ThreadBackendTests(TaskTestMixin, TestCase):
+    def test_retried_in_thread(self):
+        failures.append(True)
+        done = threading.Event()
+
+        @task
+        def signal_task():
+            flaky_task("value")
+            done.set()
+
+        with self.assertLogs("tasks.backends", "WARNING"):
+            ThreadBackend().enqueue(signal_task.name, [], {})
+            self.assertTrue(done.wait(5))
+        self.assertEqual(calls, ["value"])
@@ -0,0 +1,59 @@
+""" Short-lived cache of authenticated users.
+
+Loading request.user normally costs one query per request. The user is
+cached under its id for settings.AUTH_USER_CACHE_TIMEOUT seconds and the
+entry is deleted whenever the user is saved or deleted (users.signals).
+Changes made with QuerySet.update() skip the signals and are only seen
+once the entry expires.
+
+The session auth hash is still checked against the cached user on every
+request, so a password change logs other sessions out as before. With
+several processes the cache must be shared (not LocMemCache), otherwise
+other processes keep the old user until the timeout.
+"""
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+
+def user_cache_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def _cache():
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+def get_user(request):
+    """ Like django.contrib.auth.get_user(), reading the user from the cache. """
+    if not settings.AUTH_USER_CACHE_TIMEOUT:
+        return auth.get_user(request)
+    try:
+        user_id = auth._get_user_session_key(request)
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    key = user_cache_key(user_id)
+    user = _cache().get(key)
+    if user is not None:
+        session_hash = request.session.get(auth.HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(session_hash, user.get_session_auth_hash()):
+            return user
+        # Let Django decide (legacy hashes, flushing the session)
+        _cache().delete(key)
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        _cache().set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_user(user_id):
+    """ Drop the cached user (it changed). """
+    _cache().delete(user_cache_key(user_id))
@@ -0,0 +1,13 @@
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from .cache import get_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """ AuthenticationMiddleware loading request.user through users.cache. """
+
+    def process_request(self, request):
+        super().process_request(request)
+        # Still lazy: requests that never touch the user make no lookup
+        request.user = SimpleLazyObject(lambda: get_user(request))
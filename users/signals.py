@@ -0,0 +1,14 @@
+""" Signal receivers keeping the authenticated user cache in sync. """
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """ User changed (password, permissions, last login): drop its cached copy. """
+    invalidate_user(instance.id)
@@ -0,0 +1,55 @@
+from django.test import TestCase, Client, override_settings
+from django.shortcuts import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username="test", email="test@email.com", password="test"
+        )
+        self.assertTrue(self.client.login(username="test", password="test"))
+        self.url = reverse("learning_logs:index")
+
+    def _queries(self, client=None):
+        """ Get home page as the logged in user, return number of queries. """
+        client = client or self.client
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(self.url)
+        self.assertEqual(response.wsgi_request.user, self.user)
+        return len(queries)
+
+    def test_second_request_makes_no_queries(self):
+        self._queries()
+        self.assertEqual(self._queries(), 0)
+
+    def test_saved_user_is_loaded_again(self):
+        self._queries()
+        self.user.first_name = "Changed"
+        self.user.save()
+        self.assertEqual(self._queries(), 1)
+        self.assertEqual(self.client.get(self.url).wsgi_request.user.first_name, "Changed")
+
+    def test_password_change_logs_out(self):
+        self._queries()
+        self.user.set_password("other")
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self._queries()
+        self.assertEqual(self._queries(), 1)
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_signed_cookie_sessions(self):
+        client = Client()
+        self.assertTrue(client.login(username="test", password="test"))
+        self._queries(client)
+        self.assertEqual(self._queries(client), 0)